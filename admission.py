@@ -0,0 +1,94 @@
+import multiprocessing
+import time
+
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Slots of the shared counter array
+ACTIVE, WAITING, ADMITTED, REJECTED, TIMED_OUT, WAIT_TOTAL, WAIT_MAX, RENDER_TOTAL, RENDER_COUNT = range(9)
+
+
+class AdmissionController:
+    """
+    Caps concurrent renders at max_concurrent. Up to max_waiting further
+    requests wait (at most max_wait seconds) for a free slot; anything
+    beyond that is rejected straight away with Overloaded so bursts turn
+    into fast 503s instead of a pile of competing doc.build calls.
+
+    The slots and counters live in shared memory, so a controller created
+    before gunicorn forks its workers (preload_app) limits the whole
+    server rather than each worker on its own.
+    """
+
+    def __init__(self, max_concurrent, max_waiting, max_wait=10.0):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+
+        self._condition = multiprocessing.Condition()
+        self._counters = multiprocessing.RawArray('d', 9)
+
+    def _retry_after(self):
+        # Rough time for the queue ahead to drain, at least one second
+        counters = self._counters
+        average = counters[RENDER_TOTAL] / counters[RENDER_COUNT] if counters[RENDER_COUNT] else 1.0
+        backlog = (counters[WAITING] + counters[ACTIVE]) / max(self.max_concurrent, 1)
+        return max(1, int(round(average * backlog)))
+
+    def acquire(self):
+        """Take a render slot, returning the seconds spent waiting for it."""
+        started = time.perf_counter()
+        counters = self._counters
+        with self._condition:
+            if counters[ACTIVE] >= self.max_concurrent:
+                if counters[WAITING] >= self.max_waiting:
+                    counters[REJECTED] += 1
+                    raise Overloaded('Server is busy, please retry', self._retry_after())
+
+                counters[WAITING] += 1
+                try:
+                    deadline = started + self.max_wait
+                    while counters[ACTIVE] >= self.max_concurrent:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            counters[TIMED_OUT] += 1
+                            raise Overloaded('Timed out waiting for a render slot', self._retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    counters[WAITING] -= 1
+
+            counters[ACTIVE] += 1
+            counters[ADMITTED] += 1
+            waited = time.perf_counter() - started
+            counters[WAIT_TOTAL] += waited
+            counters[WAIT_MAX] = max(counters[WAIT_MAX], waited)
+            return waited
+
+    def release(self, render_seconds=None):
+        counters = self._counters
+        with self._condition:
+            counters[ACTIVE] -= 1
+            if render_seconds is not None:
+                counters[RENDER_TOTAL] += render_seconds
+                counters[RENDER_COUNT] += 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            counters = list(self._counters)
+        admitted = int(counters[ADMITTED])
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_waiting': self.max_waiting,
+            'active': int(counters[ACTIVE]),
+            'queue_depth': int(counters[WAITING]),
+            'admitted': admitted,
+            'rejected': int(counters[REJECTED]),
+            'timed_out': int(counters[TIMED_OUT]),
+            'avg_wait_ms': round(counters[WAIT_TOTAL] / admitted * 1000, 2) if admitted else 0.0,
+            'max_wait_ms': round(counters[WAIT_MAX] * 1000, 2),
+        }
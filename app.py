@@ -1,18 +1,271 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, Response, stream_with_context, url_for, g
 from flask_cors import CORS
-from invoice_generator import InvoiceGenerator
+# invoice_generator (and with it ReportLab) is imported by the handlers that
+# render, so processes that only compute totals or previews never load it
+from invoice_templates import registry as template_registry, tenant_key
+from pdf_cache import PDFCache, cache_key
+from invoice_jobs import InvoiceJobQueue, QueueFull, DONE
+from invoice_totals import compute_totals, compute_totals_batch
+from metrics import StageTimer, NULL_TIMER
+from admission import AdmissionController, Overloaded
+from invoice_archive import InvoiceArchive
+from invoice_stream import InvoiceStream, StreamFormatError
+from invoice_preview import preview as preview_invoice
+from invoice_schema import InvoiceSchema, ValidationError
+import metrics
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 import os
 import io
+import itertools
+import json
+import zipfile
+import threading
+import time
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 
 
 app = Flask(__name__)
 CORS(app)   
 
 
-# Use current directory for invoices
-INVOICES_DIR = os.path.join(os.getcwd(), 'invoices')
-os.makedirs(INVOICES_DIR, exist_ok=True)
+LOGO_PATH = os.environ.get(
+    'INVOICE_LOGO_PATH',
+    r"C:\Users\risha\OneDrive\Documents\Programs\Invoice Generator\fascinoai.png"
+)
+
+# Per-seller branding, keyed by seller GSTIN: {"27AAAAA0000A1Z5": {"logo_path": ..., "signatory_text": ...}}
+TENANTS_FILE = os.environ.get('INVOICE_TENANTS_FILE')
+if TENANTS_FILE:
+    with open(TENANTS_FILE) as tenants_file:
+        template_registry.load(json.load(tenants_file))
+
+# Payload schema, compiled once; MAX_INVOICE_ITEMS bounds items per JSON invoice
+MAX_INVOICE_ITEMS = int(os.environ.get('MAX_INVOICE_ITEMS', 10000))
+invoice_schema = InvoiceSchema(max_items=MAX_INVOICE_ITEMS)
+
+# PDFs are rendered in memory; set SAVE_INVOICES=1 to also keep a copy on disk
+SAVE_INVOICES = os.environ.get('SAVE_INVOICES', '').lower() in ('1', 'true', 'yes')
+INVOICES_DIR = os.environ.get('INVOICES_DIR', os.path.join(os.getcwd(), 'invoices'))
+if SAVE_INVOICES:
+    os.makedirs(INVOICES_DIR, exist_ok=True)
+
+# Content-addressed cache of rendered PDFs, in memory only unless PDF_CACHE_DIR
+# names a directory for the disk tier (which worker processes may share)
+PDF_CACHE_ENABLED = os.environ.get('PDF_CACHE', '1').lower() in ('1', 'true', 'yes')
+pdf_cache = PDFCache(
+    max_memory_bytes=int(os.environ.get('PDF_CACHE_MEMORY_MB', 64)) * 1024 * 1024,
+    disk_dir=os.environ.get('PDF_CACHE_DIR') or None,
+    max_disk_bytes=int(os.environ.get('PDF_CACHE_DISK_MB', 1024)) * 1024 * 1024
+) if PDF_CACHE_ENABLED else None
+
+# Engine for /api/generate-invoice: 'auto' draws standard one-page invoices
+# straight onto the canvas, 'platypus' always lays out with InvoiceGenerator
+RENDER_ENGINE = os.environ.get('RENDER_ENGINE', 'auto')
+
+# Per-stage request timing (Server-Timing header + /metrics); METRICS=0 turns it off.
+# With several worker processes, METRICS_DIR (gunicorn.conf.py sets one) lets
+# /metrics report every worker rather than only the one that answers
+METRICS_ENABLED = os.environ.get('METRICS', '1').lower() in ('1', 'true', 'yes')
+if METRICS_ENABLED and os.environ.get('METRICS_DIR'):
+    metrics.registry.share(os.environ['METRICS_DIR'])
+
+# Admission control: at most MAX_CONCURRENT_RENDERS renders at once,
+# MAX_QUEUED_RENDERS more may wait up to RENDER_QUEUE_TIMEOUT seconds.
+# The limits are shared by worker processes forked after this point;
+# gunicorn.conf.py sizes them for its workers
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get('MAX_CONCURRENT_RENDERS', os.cpu_count() or 1)),
+    max_waiting=int(os.environ.get('MAX_QUEUED_RENDERS', 2 * (os.cpu_count() or 1))),
+    max_wait=float(os.environ.get('RENDER_QUEUE_TIMEOUT', 10))
+)
+
+# Optional write-once archive of every generated PDF; set ARCHIVE_DIR to enable
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')
+archive = InvoiceArchive(
+    ARCHIVE_DIR,
+    max_segment_bytes=int(os.environ.get('ARCHIVE_SEGMENT_MB', 256)) * 1024 * 1024
+) if ARCHIVE_DIR else None
+
+# Batch rendering runs in worker processes since ReportLab layout is CPU-bound
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        return _render_pool
+
+
+def discard_render_pool(pool):
+    """Drop a pool whose worker died, so the next render starts a fresh one."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@app.before_request
+def _start_timer():
+    if METRICS_ENABLED:
+        g.timer = StageTimer()
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _finish_timer(response):
+    timer = g.get('timer')
+    if timer is not None and timer.durations:
+        response.headers['Server-Timing'] = timer.server_timing()
+        metrics.record_request(timer, time.perf_counter() - g.request_started)
+    return response
+
+
+def _overloaded(error):
+    return jsonify({'error': str(error)}), 503, {'Retry-After': str(error.retry_after)}
+
+
+def _render_in_pool(data):
+    from invoice_generator import render_invoice_job
+    pool = get_render_pool()
+    try:
+        _, filename, pdf_bytes, error = pool.submit(render_invoice_job, 0, data, LOGO_PATH).result()
+    except BrokenProcessPool:
+        # This job fails; later ones get a fresh pool
+        discard_render_pool(pool)
+        raise
+    if error is not None:
+        raise RuntimeError(error)
+    return filename, pdf_bytes
+
+
+# Background jobs: a bounded queue drained by a fixed set of workers,
+# each handing the actual render to the process pool. Job state lives in
+# a SQLite file (JOBS_DB) shared by every server process on the host,
+# created when jobs are first used
+job_queue = InvoiceJobQueue(
+    render=_render_in_pool,
+    path=os.environ.get('JOBS_DB', os.path.join(os.getcwd(), 'invoice_jobs.sqlite3')),
+    workers=int(os.environ.get('JOB_WORKERS', BATCH_WORKERS)),
+    max_queued=int(os.environ.get('JOB_QUEUE_SIZE', 100)),
+    ttl_seconds=int(os.environ.get('JOB_TTL_SECONDS', 3600))
+)
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile that hands back whatever was written so far."""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _invalid(error):
+    return jsonify({'error': str(error), 'errors': error.errors}), 400
+
+
+def _stream_invoice_zip(payloads):
+    """
+    Render payloads across the process pool and yield a ZIP archive
+    incrementally. Only a bounded number of renders are in flight so
+    finished PDFs never accumulate in memory.
+    """
+    from invoice_generator import render_invoice_job
+    
+    sink = _ZipStream()
+    manifest = []
+    used_names = set()
+    
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        
+        def add_result(index, filename, pdf_bytes, error):
+            if error is not None:
+                manifest.append({'index': index, 'status': 'failed', 'error': error})
+                return
+            name = filename
+            if name in used_names:
+                name = f'{os.path.splitext(filename)[0]}_{index}.pdf'
+            used_names.add(name)
+            archive.writestr(name, pdf_bytes)
+            manifest.append({'index': index, 'status': 'ok', 'filename': name})
+        
+        def submit(index, data):
+            pool = get_render_pool()
+            try:
+                future = pool.submit(render_invoice_job, index, data, LOGO_PATH)
+            except BrokenProcessPool:
+                discard_render_pool(pool)
+                pool = get_render_pool()
+                future = pool.submit(render_invoice_job, index, data, LOGO_PATH)
+            submitted[future] = (index, pool)
+            return future
+        
+        def collect(done):
+            # One failed render (even a dead worker process) becomes a
+            # failed manifest entry instead of aborting the whole ZIP
+            for future in done:
+                index, pool = submitted.pop(future)
+                try:
+                    add_result(*future.result())
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        discard_render_pool(pool)
+                    add_result(index, None, None, f'Render failed: {e}')
+        
+        max_in_flight = BATCH_WORKERS * 2
+        submitted = {}
+        pending = set()
+        
+        for index, data in enumerate(payloads):
+            try:
+                data = invoice_schema.validate(data)
+            except ValidationError as e:
+                add_result(index, None, None, str(e))
+                continue
+            
+            try:
+                pending.add(submit(index, data))
+            except Exception as e:
+                add_result(index, None, None, f'Render failed: {e}')
+                continue
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+                yield sink.drain()
+        
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+            yield sink.drain()
+        
+        manifest.sort(key=lambda entry: entry['index'])
+        archive.writestr('manifest.json', json.dumps({
+            'total': len(manifest),
+            'succeeded': sum(1 for entry in manifest if entry['status'] == 'ok'),
+            'failed': sum(1 for entry in manifest if entry['status'] == 'failed'),
+            'invoices': manifest,
+        }, indent=2))
+    
+    yield sink.drain()
 
 
 @app.route('/api/generate-invoice', methods=['POST'])
@@ -21,122 +274,259 @@ def generate_invoice():
     Receive invoice data and generate PDF
     Expected JSON structure from frontend
     """
+    from invoice_generator import render_invoice, invoice_filename
+    
+    timer = g.get('timer', NULL_TIMER)
     try:
-        data = request.json
+        with timer.stage('parse'):
+            data = request.get_json(silent=True)
         
-        # Validate required fields
-        if not data.get('company_info') or not data.get('buyer_info') or not data.get('items'):
-            return jsonify({'error': 'Missing required fields: company_info, buyer_info, items'}), 400
+        # Reject bad payloads before any rendering work
+        with timer.stage('validate'):
+            try:
+                data = invoice_schema.validate(data)
+            except ValidationError as e:
+                return _invalid(e)
         
-        # Create safe filename without spaces
-        safe_invoice_number = data['invoice_number'].replace(' ', '_').replace('/', '_')
-        pdf_filename = f'Invoice_{safe_invoice_number}.pdf'
-        pdf_filepath = os.path.join(INVOICES_DIR, pdf_filename)
+        pdf_filename = invoice_filename(data['invoice_number'])
         
-        # Create invoice generator
-        invoice = InvoiceGenerator(
-            output_filename=pdf_filepath,
-            logo_path=r"C:\Users\risha\OneDrive\Documents\Programs\Invoice Generator\fascinoai.png"
-        )
+        # The footer carries the generation date, and the engine decides the
+        # exact bytes, so both are part of the key
+        with timer.stage('cache'):
+            generated_on = datetime.now().strftime('%d/%m/%Y')
+            template = template_registry.get(tenant_key(data['company_info']), logo_path=LOGO_PATH)
+            etag = cache_key(data, template=template.config, generated_on=generated_on, engine=RENDER_ENGINE)
         
-        # Add logo and invoice details
-        invoice.add_logo_and_invoice_details(
-            company_info=data['company_info'],
-            invoice_number=data['invoice_number'],
-            invoice_date=data['invoice_date'],
-            po_number=data.get('po_number'),
-            agreement=data.get('agreement')
-        )
+        # Output is deterministic, so a matching ETag means the client already has it
+        if etag in request.if_none_match:
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
         
-        # Add party details
-        invoice.add_party_details(
-            seller_info=data['company_info'],
-            buyer_info=data['buyer_info']
-        )
+        totals = None
+        with timer.stage('cache'):
+            pdf_bytes = pdf_cache.get(etag) if pdf_cache else None
+        if pdf_bytes is None:
+            with timer.stage('totals'):
+                totals = compute_totals(data)
+            
+            with timer.stage('queue'):
+                admission.acquire()
+            started = time.perf_counter()
+            try:
+                # Render straight into memory; nothing touches the disk
+                invoice = render_invoice(
+                    data, logo_path=LOGO_PATH, generated_on=generated_on, reproducible=True,
+                    totals=totals, timer=timer, engine=RENDER_ENGINE
+                )
+            finally:
+                admission.release(time.perf_counter() - started)
+            pdf_bytes = invoice.get_pdf_bytes()
+            if timer.enabled:
+                metrics.record_invoice(len(data['items']), len(pdf_bytes), invoice.page_count)
+            if pdf_cache:
+                with timer.stage('io'):
+                    pdf_cache.put(etag, pdf_bytes)
         
-        # Add items
-        invoice.add_items(data['items'])
-        
-        # Calculate totals
-        subtotal = sum(item['quantity'] * item['rate'] for item in data['items'])
-        
-        # Handle discount
-        discount_type = data.get('discount_type', 'none')
-        discount_value = float(data.get('discount_value', 0))
-        discount_amount = 0
-        
-        if discount_type == 'percentage':
-            discount_amount = subtotal * (discount_value / 100)
-        elif discount_type == 'amount':
-            discount_amount = discount_value
-        
-        # Subtotal after discount
-        subtotal_after_discount = subtotal - discount_amount
-        
-        # Calculate tax on discounted amount
-        cgst_rate, cgst_amt, sgst_rate, sgst_amt, igst_rate, igst_amt = \
-            InvoiceGenerator.calculate_tax(
-                subtotal=subtotal_after_discount,
-                seller_state=data['company_info']['state'],
-                buyer_state=data['buyer_info']['state'],
-                cgst_rate=float(data.get('cgst_rate', 9)),
-                sgst_rate=float(data.get('sgst_rate', 9)),
-                igst_rate=float(data.get('igst_rate', 18))
-            )
+        # Optionally keep a copy on disk
+        if SAVE_INVOICES:
+            with timer.stage('io'):
+                with open(os.path.join(INVOICES_DIR, pdf_filename), 'wb') as pdf_file:
+                    pdf_file.write(pdf_bytes)
         
-        shipping_charges = float(data.get('shipping_charges', 0))
-        total = subtotal_after_discount + cgst_amt + sgst_amt + igst_amt + shipping_charges
-        
-        # Add totals with NEW discount support
-        invoice.add_totals(
-            subtotal=subtotal,
-            discount_type=discount_type,
-            discount_value=discount_value,
-            discount_amount=discount_amount,
-            cgst_rate=cgst_rate,
-            cgst_amount=cgst_amt,
-            sgst_rate=sgst_rate,
-            sgst_amount=sgst_amt,
-            igst_rate=igst_rate,
-            igst_amount=igst_amt,
-            shipping_amount=shipping_charges,
-            total_amount=total
-        )
+        archive_id = None
+        if archive:
+            with timer.stage('io'):
+                archive_id = archive.store(pdf_bytes, data, totals or compute_totals(data))
         
-        # Generate PDF
-        pdf_path = invoice.generate()
+        response = send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=pdf_filename,
+            etag=etag
+        )
+        if archive_id is not None:
+            response.headers['X-Archive-Id'] = str(archive_id)
+        return response
+    
+    except Overloaded as e:
+        return _overloaded(e)
+    except Exception as e:
+        print(f"Error: {str(e)}")  # Print to console for debugging
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+MAX_STREAM_ITEMS = int(os.environ.get('MAX_STREAM_ITEMS', 100000))
+
+
+def _validated_items(items):
+    # Same checks and error shape as the items of /api/generate-invoice
+    for index, item in enumerate(items):
+        if index >= MAX_STREAM_ITEMS:
+            raise ValidationError([{'field': 'items', 'message': f'must have at most {MAX_STREAM_ITEMS} items'}])
+        yield invoice_schema.validate_item(item, index)
+
+
+@app.route('/api/generate-invoice-stream', methods=['POST'])
+def generate_invoice_stream():
+    """
+    Generate a PDF for an invoice uploaded as a stream: a header line,
+    then the items as NDJSON or a JSON array (see invoice_stream.py).
+    Items are parsed, totalled and laid out page by page while the body
+    is still arriving, so huge invoices never sit in memory whole.
+    """
+    from invoice_generator import render_invoice_stream, invoice_filename
+    
+    timer = g.get('timer', NULL_TIMER)
+    try:
+        invoice_stream = InvoiceStream(request.stream)
+        with timer.stage('parse'):
+            header = invoice_stream.read_header()
         
-        # Check if file was created
-        if not os.path.exists(pdf_path):
-            return jsonify({'error': 'Failed to generate PDF file'}), 500
+        with timer.stage('validate'):
+            header = invoice_schema.validate_header(header)
+            items = _validated_items(invoice_stream.items())
+            first_item = next(items, None)
+            if first_item is None:
+                raise ValidationError([{'field': 'items', 'message': 'must have at least 1 item(s)'}])
         
-        # Read PDF file into memory
+        with timer.stage('queue'):
+            admission.acquire()
+        started = time.perf_counter()
         try:
-            with open(pdf_path, 'rb') as pdf_file:
-                pdf_data = io.BytesIO(pdf_file.read())
-            
-            pdf_data.seek(0)
-            
-            # Return PDF file from memory
-            response = send_file(
-                pdf_data,
-                mimetype='application/pdf',
-                as_attachment=True,
-                download_name=pdf_filename
+            invoice, running = render_invoice_stream(
+                header, itertools.chain([first_item], items), logo_path=LOGO_PATH,
+                generated_on=datetime.now().strftime('%d/%m/%Y'), reproducible=True, timer=timer
             )
+        finally:
+            admission.release(time.perf_counter() - started)
+        pdf_bytes = invoice.get_pdf_bytes()
+        if timer.enabled:
+            metrics.record_invoice(running.item_count, len(pdf_bytes), invoice.page_count)
+        
+        pdf_filename = invoice_filename(header['invoice_number'])
+        if SAVE_INVOICES:
+            with timer.stage('io'):
+                with open(os.path.join(INVOICES_DIR, pdf_filename), 'wb') as pdf_file:
+                    pdf_file.write(pdf_bytes)
+        
+        archive_id = None
+        if archive:
+            with timer.stage('io'):
+                archive_id = archive.store(pdf_bytes, header, running.totals)
+        
+        response = send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=pdf_filename
+        )
+        response.headers['X-Invoice-Items'] = str(running.item_count)
+        response.headers['X-Invoice-Total'] = str(running.totals.total_amount)
+        if archive_id is not None:
+            response.headers['X-Archive-Id'] = str(archive_id)
+        return response
+    
+    except StreamFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except ValidationError as e:
+        return _invalid(e)
+    except Overloaded as e:
+        return _overloaded(e)
+    except Exception as e:
+        print(f"Error: {str(e)}")  # Print to console for debugging
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/generate-invoices', methods=['POST'])
+def generate_invoices():
+    """
+    Render a batch of invoices and stream them back as a ZIP archive.
+    Accepts either a JSON list of invoice payloads or {"invoices": [...]}.
+    Per-invoice failures are listed in manifest.json inside the archive.
+    """
+    data = request.get_json(silent=True)
+    payloads = data.get('invoices') if isinstance(data, dict) else data
+    
+    if not isinstance(payloads, list) or not payloads:
+        return jsonify({'error': 'Expected a non-empty list of invoices'}), 400
+    if len(payloads) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large: at most {MAX_BATCH_SIZE} invoices per request'}), 400
+    
+    filename = f'Invoices_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+    return Response(
+        stream_with_context(_stream_invoice_zip(payloads)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+MAX_STATEMENT_INVOICES = int(os.environ.get('MAX_STATEMENT_INVOICES', 500))
+
+
+def _buyer_identity(data):
+    buyer_info = data['buyer_info']
+    return (buyer_info.get('gstin') or buyer_info.get('name') or '').strip().upper()
+
+
+@app.route('/api/generate-statement', methods=['POST'])
+def generate_statement():
+    """
+    Combine several invoices from one seller to one buyer into one PDF.
+    Accepts a JSON list of invoice payloads or {"invoices": [...]}.
+    """
+    from invoice_generator import render_statement
+    
+    timer = g.get('timer', NULL_TIMER)
+    try:
+        data = request.get_json(silent=True)
+        payloads = data.get('invoices') if isinstance(data, dict) else data
+        
+        with timer.stage('validate'):
+            if not isinstance(payloads, list) or not payloads:
+                return jsonify({'error': 'Expected a non-empty list of invoices'}), 400
+            if len(payloads) > MAX_STATEMENT_INVOICES:
+                return jsonify({'error': f'At most {MAX_STATEMENT_INVOICES} invoices per statement'}), 400
             
-            # Clean up file after sending (optional)
             try:
-                os.remove(pdf_path)
-            except:
-                pass  # File in use, will be cleaned up later
+                payloads = [invoice_schema.validate(invoice_data, f'invoices[{index}]')
+                            for index, invoice_data in enumerate(payloads)]
+            except ValidationError as e:
+                return _invalid(e)
             
-            return response
+            buyers = {_buyer_identity(invoice_data) for invoice_data in payloads}
+            if len(buyers) > 1:
+                return jsonify({'error': 'All invoices in a statement must be for the same buyer'}), 400
+            # Every page carries the seller's logo, name and signatory
+            sellers = {tenant_key(invoice_data['company_info']) for invoice_data in payloads}
+            if len(sellers) > 1:
+                return jsonify({'error': 'All invoices in a statement must be from the same seller'}), 400
         
-        except Exception as file_error:
-            print(f"File error: {str(file_error)}")
-            return jsonify({'error': f'Error reading PDF file: {str(file_error)}'}), 500
+        with timer.stage('queue'):
+            admission.acquire()
+        started = time.perf_counter()
+        try:
+            statement = render_statement(payloads, logo_path=LOGO_PATH, timer=timer)
+        finally:
+            admission.release(time.perf_counter() - started)
+        pdf_bytes = statement.get_pdf_bytes()
         
+        buyer_name = payloads[0]['buyer_info'].get('name') or 'Buyer'
+        safe_buyer = buyer_name.replace(' ', '_').replace('/', '_')
+        return send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'Statement_{safe_buyer}_{datetime.now().strftime("%Y%m%d")}.pdf'
+        )
+    
+    except Overloaded as e:
+        return _overloaded(e)
     except Exception as e:
         print(f"Error: {str(e)}")  # Print to console for debugging
         import traceback
@@ -144,13 +534,236 @@ def generate_invoice():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/invoice-totals', methods=['POST'])
+def invoice_totals():
+    """
+    Compute totals for a list of invoices without rendering any PDFs.
+    Amounts are returned column-wise as 2dp strings.
+    """
+    data = request.get_json(silent=True)
+    payloads = data.get('invoices') if isinstance(data, dict) else data
+    
+    if not isinstance(payloads, list):
+        return jsonify({'error': 'Expected a list of invoices'}), 400
+    
+    columns = compute_totals_batch(payloads)
+    for name, values in columns.items():
+        if name not in ('invoice_number', 'errors'):
+            columns[name] = [None if value is None else str(value) for value in values]
+    return jsonify(columns)
+
+
+@app.route('/api/preview', methods=['POST'])
+def preview():
+    """
+    Totals, tax split, amount in words and an estimated page count for
+    one invoice, computed without rendering so the form can call it on
+    every keystroke.
+    """
+    try:
+        data = invoice_schema.validate_draft(request.get_json(silent=True))
+    except ValidationError as e:
+        return _invalid(e)
+    
+    logo_path = template_registry.logo_path(tenant_key(data['company_info']), logo_path=LOGO_PATH)
+    return jsonify(preview_invoice(data, has_logo=bool(logo_path) and os.path.isfile(logo_path)))
+
+
+def _job_response(job):
+    body = job.to_dict()
+    body['status_url'] = url_for('get_invoice_job', job_id=job.id)
+    if job.status == DONE:
+        body['download_url'] = url_for('download_invoice_job', job_id=job.id)
+    return body
+
+
+@app.route('/api/invoice-jobs', methods=['POST'])
+def create_invoice_job():
+    """Queue an invoice for background rendering and return its job id"""
+    try:
+        data = invoice_schema.validate(request.get_json(silent=True))
+    except ValidationError as e:
+        return _invalid(e)
+    
+    try:
+        job = job_queue.submit(data)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    
+    return jsonify(_job_response(job)), 202, {'Location': url_for('get_invoice_job', job_id=job.id)}
+
+
+@app.route('/api/invoice-jobs/<job_id>', methods=['GET'])
+def get_invoice_job(job_id):
+    """Report job status: queued, running, done or failed"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(_job_response(job))
+
+
+@app.route('/api/invoice-jobs/<job_id>/download', methods=['GET'])
+def download_invoice_job(job_id):
+    """Download the PDF of a finished job"""
+    job = job_queue.get(job_id, with_pdf=True)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    if job.status != DONE:
+        return jsonify({'error': f'Job is {job.status}', **_job_response(job)}), 409
+    
+    return send_file(
+        io.BytesIO(job.pdf_bytes),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=job.filename
+    )
+
+
+def _archive_record(record):
+    record = dict(record)
+    record['pdf_url'] = url_for('archived_invoice_pdf', archive_id=record['id'])
+    return record
+
+
+@app.route('/api/archive/invoices', methods=['GET'])
+def list_archived_invoices():
+    """
+    List archived invoices, newest first. Filters: invoice_number,
+    buyer_gstin, date_from, date_to (YYYY-MM-DD), min_total, max_total
+    (rupees, inclusive), limit, offset.
+    """
+    if archive is None:
+        return jsonify({'error': 'Invoice archive is not enabled'}), 404
+    
+    try:
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    
+    try:
+        min_total = Decimal(request.args['min_total']) if request.args.get('min_total') else None
+        max_total = Decimal(request.args['max_total']) if request.args.get('max_total') else None
+    except InvalidOperation:
+        min_total = max_total = Decimal('NaN')
+    if any(value is not None and not value.is_finite() for value in (min_total, max_total)):
+        return jsonify({'error': 'min_total and max_total must be numbers'}), 400
+    
+    records = archive.find(
+        invoice_number=request.args.get('invoice_number'),
+        buyer_gstin=request.args.get('buyer_gstin'),
+        date_from=request.args.get('date_from'),
+        date_to=request.args.get('date_to'),
+        min_total=min_total,
+        max_total=max_total,
+        limit=limit,
+        offset=offset
+    )
+    return jsonify({'invoices': [_archive_record(record) for record in records], 'limit': limit, 'offset': offset})
+
+
+@app.route('/api/archive/invoices/<int:archive_id>', methods=['GET'])
+def archived_invoice(archive_id):
+    """Index entry for one archived invoice"""
+    record = archive.get(archive_id) if archive else None
+    if record is None:
+        return jsonify({'error': 'Archived invoice not found'}), 404
+    return jsonify(_archive_record(record))
+
+
+@app.route('/api/archive/invoices/<int:archive_id>/pdf', methods=['GET'])
+def archived_invoice_pdf(archive_id):
+    """Serve an archived PDF, honouring single HTTP Range requests"""
+    from invoice_generator import invoice_filename
+    
+    record = archive.get(archive_id) if archive else None
+    if record is None:
+        return jsonify({'error': 'Archived invoice not found'}), 404
+    
+    length = record['length']
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{record["sha256"]}"',
+        'Content-Disposition': f'inline; filename={invoice_filename(record["invoice_number"])}',
+    }
+    
+    if request.if_none_match.contains(record['sha256']):
+        return Response(status=304, headers=headers)
+    
+    byte_range = request.range
+    if byte_range is None:
+        return Response(archive.read(record), mimetype='application/pdf', headers=headers)
+    
+    span = byte_range.range_for_length(length)
+    if span is None:
+        headers['Content-Range'] = f'bytes */{length}'
+        return Response(status=416, headers=headers)
+    
+    start, stop = span
+    headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+    return Response(archive.read(record, start, stop), status=206, mimetype='application/pdf', headers=headers)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of request stage timings and invoice sizes"""
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    """
+    Health check endpoint. The memory tier of the PDF cache belongs to the
+    worker process that answers (see pid); jobs and admission are shared.
+    """
+    health = {'status': 'healthy', 'timestamp': datetime.now().isoformat(), 'pid': os.getpid()}
+    if pdf_cache:
+        health['pdf_cache'] = pdf_cache.stats()
+    health['jobs'] = job_queue.stats()
+    health['admission'] = admission.stats()
+    if archive:
+        health['archive'] = archive.stats()
+    return jsonify(health)
+
+
+# Throwaway invoice used to load ReportLab, fonts, styles and the logo
+# into a worker before it accepts traffic
+WARMUP_PAYLOAD = {
+    'invoice_number': 'WARMUP/0001',
+    'invoice_date': '2025-01-01',
+    'po_number': 'PO-0001',
+    'company_info': {
+        'name': 'Warmup Seller', 'address': 'Address', 'city': 'City', 'state': 'State',
+        'pincode': '000000', 'gstin': '', 'email': 'warmup@example.com'
+    },
+    'buyer_info': {
+        'name': 'Warmup Buyer', 'address': 'Address', 'city': 'City', 'state': 'Other State',
+        'pincode': '000000', 'gstin': ''
+    },
+    'items': [{'description': 'Warmup item', 'hsn_code': '0000', 'quantity': 1, 'rate': 1.0}],
+    'discount_type': 'percentage',
+    'discount_value': 1,
+}
+
+
+def warm_up():
+    """
+    Render a throwaway invoice through both engines so the first real
+    request pays no import or cache cost: the canvas engine serves
+    standard invoices, platypus every multi-page one.
+    """
+    started = time.perf_counter()
+    from invoice_generator import render_invoice
+    for engine in ('auto', 'platypus'):
+        render_invoice(WARMUP_PAYLOAD, logo_path=LOGO_PATH, generated_on='01/01/2025', reproducible=True,
+                       engine=engine)
+    return time.perf_counter() - started
 
 
 if __name__ == '__main__':
+    # Development server only; in production run gunicorn -c gunicorn.conf.py app:app
     # Get port from environment or default to 5000
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
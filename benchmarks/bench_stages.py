@@ -0,0 +1,225 @@
+"""
+Times every InvoiceGenerator stage against synthetic invoices.
+
+    python -m benchmarks.bench_stages                      # run and compare with the baseline
+    python -m benchmarks.bench_stages --save-baseline      # record a new baseline
+    python -m benchmarks.bench_stages --sizes 1 10 100 --threshold 0.25
+
+Each stage is timed separately (best of --repeat runs) and measured for
+peak Python memory with tracemalloc in one extra run, both cold (the
+section cache cleared before every run) and warm (the cache filled by a
+run beforehand), reported as stage[size,cold] and stage[size,warm]. The
+endpoint renders with the platypus engine like the generate stage. When a
+baseline exists, any stage slower than baseline * (1 + threshold) is
+reported and the process exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# The endpoint benchmark must measure rendering, not the PDF cache, and
+# the same InvoiceGenerator engine as the other stages
+os.environ.setdefault('PDF_CACHE', '0')
+os.environ.setdefault('RENDER_ENGINE', 'platypus')
+
+from invoice_generator import InvoiceGenerator, render_invoice, section_cache
+from invoice_templates import registry, tenant_key
+from invoice_totals import compute_totals
+from benchmarks.synthetic import invoice_payload
+
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+STAGES = [
+    'add_logo_and_invoice_details',
+    'add_party_details',
+    'add_items',
+    'add_totals',
+    'generate',
+    'endpoint',
+]
+CACHE_MODES = ['cold', 'warm']
+
+
+def _new_invoice(data):
+    template = registry.get(tenant_key(data['company_info']))
+    return InvoiceGenerator(template=template, generated_on='31/03/2025', reproducible=True)
+
+
+def _add_header_sections(invoice, data):
+    invoice.add_logo_and_invoice_details(
+        company_info=data['company_info'],
+        invoice_number=data['invoice_number'],
+        invoice_date=data['invoice_date'],
+        po_number=data.get('po_number'),
+        agreement=data.get('agreement')
+    )
+    invoice.add_party_details(seller_info=data['company_info'], buyer_info=data['buyer_info'])
+
+
+def stage_runners(data, client):
+    """
+    Map of stage name -> (setup, run). setup() builds whatever state the
+    stage needs and is not timed; run(state) is the measured part.
+    """
+    totals = compute_totals(data)
+
+    def fresh():
+        return _new_invoice(data)
+
+    def with_items():
+        invoice = fresh()
+        _add_header_sections(invoice, data)
+        invoice.add_items(data['items'], line_amounts=totals.line_amounts)
+        return invoice
+
+    def ready_to_build():
+        invoice = with_items()
+        invoice.add_totals(**totals.add_totals_kwargs())
+        return invoice
+
+    return {
+        'add_logo_and_invoice_details': (fresh, lambda invoice: invoice.add_logo_and_invoice_details(
+            company_info=data['company_info'],
+            invoice_number=data['invoice_number'],
+            invoice_date=data['invoice_date'],
+            po_number=data.get('po_number'),
+            agreement=data.get('agreement')
+        )),
+        'add_party_details': (fresh, lambda invoice: invoice.add_party_details(
+            seller_info=data['company_info'], buyer_info=data['buyer_info']
+        )),
+        'add_items': (fresh, lambda invoice: invoice.add_items(
+            data['items'], line_amounts=totals.line_amounts
+        )),
+        'add_totals': (fresh, lambda invoice: invoice.add_totals(**totals.add_totals_kwargs())),
+        'generate': (ready_to_build, lambda invoice: invoice.generate()),
+        'endpoint': (lambda: None, lambda _: _check_response(client.post('/api/generate-invoice', json=data))),
+    }
+
+
+def _check_response(response):
+    if response.status_code != 200:
+        raise RuntimeError(f'Endpoint returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+
+def measure(setup, run, repeat, cold=False):
+    """
+    Best time and peak memory of run(setup()). cold clears the section
+    cache before every setup; otherwise one untimed run fills it first.
+    """
+    def prepare():
+        if cold:
+            section_cache.clear()
+        return setup()
+
+    if not cold:
+        run(setup())
+
+    best = None
+    for _ in range(repeat):
+        state = prepare()
+        start = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    state = prepare()
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(sizes, repeat, stages, cache_modes=CACHE_MODES):
+    from app import app
+    client = app.test_client()
+
+    # Warm up caches (templates, fonts, imports) so the first size is not penalised
+    render_invoice(invoice_payload(1))
+
+    results = {}
+    for size in sizes:
+        data = invoice_payload(size, seed=size)
+        runners = stage_runners(data, client)
+        # Large inputs are slow enough that one timed run is representative
+        size_repeat = 1 if size >= 10000 else repeat
+        for stage in stages:
+            setup, run = runners[stage]
+            for mode in cache_modes:
+                seconds, peak_bytes = measure(setup, run, size_repeat, cold=mode == 'cold')
+                key = f'{stage}[{size},{mode}]'
+                results[key] = {'seconds': seconds, 'peak_bytes': peak_bytes}
+                print(f'{key:<40} {seconds * 1000:>10.2f} ms {peak_bytes / 1024:>12.1f} KiB', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human readable regression lines."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric, unit, scale in (('seconds', 'ms', 1000), ('peak_bytes', 'KiB', 1 / 1024)):
+            before, after = previous[metric], current[metric]
+            if before and after > before * (1 + threshold):
+                change = (after - before) / before * 100
+                regressions.append(
+                    f'{key:<40} {metric:<10} {before * scale:>10.2f} -> {after * scale:>10.2f} {unit} (+{change:.0f}%)'
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark InvoiceGenerator stages')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Line item counts to test')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to run')
+    parser.add_argument('--cache', nargs='+', choices=CACHE_MODES, default=CACHE_MODES,
+                        help='Section cache states to measure')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per stage (best is kept)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed slowdown before a stage counts as a regression (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.stages, args.cache)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, baseline_file, indent=2, sort_keys=True)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --save-baseline to create one')
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+        for line in regressions:
+            print(line)
+        return 1
+
+    print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Cold start benchmark: import times and time to first PDF in fresh processes.
+
+    python -m benchmarks.bench_startup                     # run and compare with the baseline
+    python -m benchmarks.bench_startup --save-baseline     # record a new baseline
+    python -m benchmarks.bench_startup --runs 10 --threshold 0.3
+
+Every scenario runs in a new interpreter, the way a cron job or function
+runtime starts, and the median of --runs is kept. 'seconds' is measured
+inside the child from just before the first import; 'process_seconds'
+is the whole child process including interpreter startup. Modules that
+must stay importable without ReportLab are checked on every run. Loading
+ReportLab from one of them, or any timing slower than
+baseline * (1 + threshold), exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import invoice_payload
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+MIN_REGRESSION_SECONDS = 0.01
+
+# Imported by totals/preview-only processes, so they must not pull in ReportLab
+LIGHT_MODULES = ['invoice_totals', 'invoice_preview', 'app']
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'reportlab': any(name.startswith('reportlab') for name in sys.modules)}}))
+'''
+
+RENDER_SCRIPT = '''
+import json, sys, time
+data = json.loads(sys.stdin.read())
+start = time.perf_counter()
+from invoice_generator import render_invoice
+pdf = render_invoice(data, generated_on='31/03/2025', reproducible=True).get_pdf_bytes()
+seconds = time.perf_counter() - start
+assert pdf.startswith(b'%PDF')
+print(json.dumps({'seconds': seconds}))
+'''
+
+ENDPOINT_SCRIPT = '''
+import json, sys, time
+data = json.loads(sys.stdin.read())
+start = time.perf_counter()
+from app import app
+response = app.test_client().post('/api/generate-invoice', json=data)
+seconds = time.perf_counter() - start
+assert response.status_code == 200, response.get_data(as_text=True)[:200]
+print(json.dumps({'seconds': seconds}))
+'''
+
+PREVIEW_SCRIPT = '''
+import json, sys, time
+data = json.loads(sys.stdin.read())
+start = time.perf_counter()
+from app import app
+response = app.test_client().post('/api/preview', json=data)
+seconds = time.perf_counter() - start
+assert response.status_code == 200, response.get_data(as_text=True)[:200]
+print(json.dumps({'seconds': seconds, 'reportlab': any(name.startswith('reportlab') for name in sys.modules)}))
+'''
+
+
+def scenarios():
+    """Map of result key -> child script."""
+    result = {'interpreter': 'import json; print(json.dumps({"seconds": 0}))'}
+    for module in LIGHT_MODULES + ['invoice_generator']:
+        result[f'import[{module}]'] = IMPORT_SCRIPT.format(module=module)
+    result['first_pdf[render_invoice]'] = RENDER_SCRIPT
+    result['first_pdf[endpoint]'] = ENDPOINT_SCRIPT
+    result['first_response[preview]'] = PREVIEW_SCRIPT
+    return result
+
+
+def run_child(script, payload):
+    # The endpoint must render, not answer from a PDF cache left by an earlier run
+    env = {**os.environ, 'PDF_CACHE': '0', 'PYTHONDONTWRITEBYTECODE': '1'}
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', script], input=payload, capture_output=True, text=True, cwd=ROOT, env=env
+    )
+    process_seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'child failed')
+    return {**json.loads(completed.stdout.strip().splitlines()[-1]), 'process_seconds': process_seconds}
+
+
+def run_benchmarks(runs, item_count):
+    payload = json.dumps(invoice_payload(item_count))
+    results = {}
+    heavy = []
+    for key, script in scenarios().items():
+        samples = [run_child(script, payload) for _ in range(runs)]
+        results[key] = {
+            'seconds': statistics.median(sample['seconds'] for sample in samples),
+            'process_seconds': statistics.median(sample['process_seconds'] for sample in samples),
+        }
+        if any(sample.get('reportlab') for sample in samples) and key != 'import[invoice_generator]':
+            heavy.append(key)
+        print(f"{key:<32} {results[key]['seconds'] * 1000:>10.1f} ms "
+              f"{results[key]['process_seconds'] * 1000:>10.1f} ms process", flush=True)
+    return results, heavy
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human readable regression lines."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric in ('seconds', 'process_seconds'):
+            before, after = previous[metric], current[metric]
+            # Process start jitters by ~10 ms, which is not a regression on a 20 ms import
+            if before and after > before * (1 + threshold) and after - before > MIN_REGRESSION_SECONDS:
+                change = (after - before) / before * 100
+                regressions.append(
+                    f'{key:<32} {metric:<16} {before * 1000:>8.1f} -> {after * 1000:>8.1f} ms (+{change:.0f}%)'
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark cold start import time and time to first PDF')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per scenario (median is kept)')
+    parser.add_argument('--items', type=int, default=5, help='Line items in the invoice rendered')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown before a scenario counts as a regression (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    results, heavy = run_benchmarks(args.runs, args.items)
+
+    status = 0
+    if heavy:
+        print(f'\nReportLab was imported by: {", ".join(heavy)}')
+        status = 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, baseline_file, indent=2, sort_keys=True)
+        print(f'Baseline saved to {args.baseline}')
+        return status
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --save-baseline to create one')
+        return status
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+        for line in regressions:
+            print(line)
+        return 1
+
+    print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Load generator for a running invoice server.
+
+    python -m benchmarks.load_test --concurrency 8 --duration 30
+    python -m benchmarks.load_test --rate 20 --requests 1000 --items 1:70 10:25 100:5
+    python -m benchmarks.load_test --jsonl payloads.jsonl --concurrency 4 --save results/peak.json
+    python -m benchmarks.load_test --concurrency 8 --compare results/peak.json
+
+Payloads come from a JSONL file (one payload per line, or an object with
+the payload under "payload", as bulk_render.py reads them) or from the
+synthetic generator, with item counts drawn from a weighted distribution
+(COUNT:WEIGHT ...). --concurrency keeps that many requests in flight
+(closed loop); --rate sends a fixed number of requests per second however
+long they take (open loop), which is what shows queueing once the server
+is saturated; open-loop latency counts from when each request was due,
+not from when a client thread got round to sending it. Reports
+throughput, p50/p95/p99 latency, error rate and response sizes; --save
+writes them as JSON and --compare prints the change against an earlier
+run.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.synthetic import invoice_payload
+
+
+DEFAULT_URL = 'http://127.0.0.1:5000/api/generate-invoice'
+DEFAULT_ITEMS = ['1:40', '5:35', '15:20', '100:5']
+
+
+def parse_distribution(specs):
+    """['1:70', '10:30'] -> ([1, 10], [70, 30]); a bare COUNT has weight 1."""
+    counts, weights = [], []
+    for spec in specs:
+        count, _, weight = spec.partition(':')
+        counts.append(int(count))
+        weights.append(float(weight or 1))
+    return counts, weights
+
+
+def synthetic_payloads(counts, weights, seed=0):
+    rng = random.Random(seed)
+    for index in itertools.count():
+        yield invoice_payload(rng.choices(counts, weights)[0], seed=seed * 1000000 + index)
+
+
+def jsonl_payloads(path):
+    """Replays the file's payloads in order, looping when it runs out."""
+    payloads = []
+    with open(path, encoding='utf-8') as input_file:
+        for line in input_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            payloads.append(record['payload'] if isinstance(record.get('payload'), dict) else record)
+    if not payloads:
+        raise ValueError(f'No payloads in {path}')
+    return itertools.cycle(payloads)
+
+
+def bust_cache(payloads):
+    # A unique invoice number per request so the server's PDF cache never answers
+    for index, data in enumerate(payloads):
+        yield {**data, 'invoice_number': f"{data.get('invoice_number', 'LOAD')}-{index}"}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.sizes = []
+        self.statuses = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, status, seconds, size):
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == 200:
+                self.latencies.append(seconds)
+                self.sizes.append(size)
+            else:
+                self.errors += 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        sizes = sorted(self.sizes)
+        total = sum(self.statuses.values())
+        return {
+            'requests': total,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(self.errors / total, 4) if total else 0.0,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+                'p50': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99': round(percentile(latencies, 0.99) * 1000, 2),
+                'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+            'response_bytes': {
+                'mean': round(sum(sizes) / len(sizes)) if sizes else 0,
+                'p50': percentile(sizes, 0.50),
+                'max': sizes[-1] if sizes else 0,
+                'total': sum(sizes),
+            },
+        }
+
+
+def send(url, data, timeout, due=None):
+    """
+    POST one payload; returns (status, seconds, response bytes). Status 0
+    is a connection failure. Seconds count from due (when an open-loop
+    request was scheduled) if given, so time spent waiting for a free
+    client thread is part of the latency rather than hidden by it.
+    """
+    body = json.dumps(data).encode('utf-8')
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter() if due is None else due
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            size = len(response.read())
+            return response.status, time.perf_counter() - start, size
+    except urllib.error.HTTPError as e:
+        size = len(e.read())
+        return e.code, time.perf_counter() - start, size
+    except (urllib.error.URLError, OSError):
+        return 0, time.perf_counter() - start, 0
+
+
+def run(url, payloads, concurrency=None, rate=None, requests=None, duration=None, timeout=60.0,
+        progress_every=5.0):
+    """Drive the server until requests are sent or duration passes."""
+    results = Results()
+    payload_lock = threading.Lock()
+    sent = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    def next_payload():
+        # None once the run is over
+        with payload_lock:
+            if requests is not None and next(sent) >= requests:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            return next(payloads)
+
+    def report():
+        elapsed = time.perf_counter() - started
+        done = sum(results.statuses.values())
+        print(f'{elapsed:6.1f}s  {done} done, {results.errors} errors, {done / elapsed:.1f} req/s', flush=True)
+
+    stop = threading.Event()
+
+    def reporter():
+        while not stop.wait(progress_every):
+            report()
+
+    threading.Thread(target=reporter, daemon=True).start()
+    try:
+        if rate:
+            # Open loop: a request is due every 1/rate seconds whether or not earlier ones finished
+            workers = concurrency or max(4, int(rate * 10))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for index in itertools.count():
+                    due = started + index / rate
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    data = next_payload()
+                    if data is None:
+                        break
+                    pool.submit(lambda data=data, due=due: results.record(*send(url, data, timeout, due)))
+        else:
+            def worker():
+                while True:
+                    data = next_payload()
+                    if data is None:
+                        return
+                    results.record(*send(url, data, timeout))
+
+            threads = [threading.Thread(target=worker) for _ in range(concurrency or 1)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        stop.set()
+
+    return results.summary(time.perf_counter() - started)
+
+
+def print_summary(summary):
+    latency = summary['latency_ms']
+    sizes = summary['response_bytes']
+    print(f"\nRequests:    {summary['requests']} in {summary['elapsed_seconds']:.1f}s")
+    print(f"Throughput:  {summary['throughput_rps']:.2f} req/s")
+    print(f"Error rate:  {summary['error_rate']:.2%}  {summary['statuses']}")
+    print(f"Latency:     p50 {latency['p50']:.1f} ms  p95 {latency['p95']:.1f} ms  "
+          f"p99 {latency['p99']:.1f} ms  max {latency['max']:.1f} ms")
+    print(f"Response:    mean {sizes['mean'] / 1024:.1f} KiB  max {sizes['max'] / 1024:.1f} KiB")
+
+
+def compare(summary, previous):
+    """Human readable change for the headline numbers against an earlier run."""
+    lines = []
+    for label, path in (
+        ('throughput_rps', ('throughput_rps',)),
+        ('error_rate', ('error_rate',)),
+        ('p50_ms', ('latency_ms', 'p50')),
+        ('p95_ms', ('latency_ms', 'p95')),
+        ('p99_ms', ('latency_ms', 'p99')),
+        ('mean_bytes', ('response_bytes', 'mean')),
+    ):
+        before, after = previous, summary
+        for key in path:
+            before, after = before.get(key, 0), after.get(key, 0)
+        change = f'{(after - before) / before * 100:+.0f}%' if before else 'n/a'
+        lines.append(f'{label:<16} {before:>12} -> {after:<12} ({change})')
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test /api/generate-invoice')
+    parser.add_argument('--url', default=DEFAULT_URL, help='Endpoint to POST payloads to')
+    parser.add_argument('--jsonl', help='Replay payloads from this JSONL file instead of synthetic ones')
+    parser.add_argument('--items', nargs='+', default=DEFAULT_ITEMS,
+                        help='Synthetic item count distribution as COUNT:WEIGHT pairs')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic payloads')
+    parser.add_argument('--bust-cache', action='store_true',
+                        help='Make every invoice number unique so the server cache is bypassed')
+    parser.add_argument('-c', '--concurrency', type=int, help='Requests in flight (closed loop)')
+    parser.add_argument('-r', '--rate', type=float, help='Requests per second (open loop)')
+    parser.add_argument('-n', '--requests', type=int, help='Stop after this many requests')
+    parser.add_argument('-d', '--duration', type=float, help='Stop after this many seconds')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per request timeout in seconds')
+    parser.add_argument('--progress-every', type=float, default=5.0, help='Seconds between progress lines')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.duration = 30.0
+    if args.concurrency is None and args.rate is None:
+        args.concurrency = 4
+
+    if args.jsonl:
+        payloads = jsonl_payloads(args.jsonl)
+        source = {'jsonl': args.jsonl}
+    else:
+        counts, weights = parse_distribution(args.items)
+        payloads = synthetic_payloads(counts, weights, seed=args.seed)
+        source = {'synthetic': dict(zip(map(str, counts), weights))}
+    if args.bust_cache:
+        payloads = bust_cache(payloads)
+
+    summary = run(args.url, payloads, concurrency=args.concurrency, rate=args.rate,
+                  requests=args.requests, duration=args.duration, timeout=args.timeout,
+                  progress_every=args.progress_every)
+    print_summary(summary)
+
+    result = {
+        'url': args.url,
+        'source': source,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'summary': summary,
+    }
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)['summary']
+        print(f'\nCompared with {args.compare}:')
+        for line in compare(summary, previous):
+            print(line)
+
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, 'w') as results_file:
+            json.dump(result, results_file, indent=2)
+        print(f'Results saved to {args.save}')
+
+    return 0 if summary['requests'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import random
+
+
+STATES = ['Maharashtra', 'Karnataka', 'Gujarat', 'Tamil Nadu', 'Delhi']
+
+PRODUCTS = [
+    'Paracetamol 500mg Tablets', 'Amoxicillin 250mg Capsules', 'Surgical Gloves (Box of 100)',
+    'Digital Thermometer', 'Cotton Bandage Roll 10cm', 'Hand Sanitizer 500ml',
+    'N95 Respirator Mask', 'Disposable Syringe 5ml with Needle, Sterile, Single Use, Pack of 100',
+    'Blood Pressure Monitor', 'Vitamin C 1000mg Effervescent',
+]
+
+
+def company():
+    return {
+        'name': 'Fascino Health Care',
+        'address': '12 Industrial Estate, Phase II',
+        'city': 'Pune',
+        'state': 'Maharashtra',
+        'pincode': '411026',
+        'gstin': '27AAFCF1234K1Z5',
+        'email': 'billing@fascino.example',
+    }
+
+
+def buyer(seed=0):
+    rng = random.Random(seed)
+    state = rng.choice(STATES)
+    return {
+        'name': f'Buyer {seed} Pharmacy',
+        'address': f'{rng.randint(1, 999)} Market Road',
+        'city': 'City',
+        'state': state,
+        'pincode': f'{rng.randint(100000, 999999)}',
+        'gstin': f'{rng.randint(10, 37)}ABCDE{rng.randint(1000, 9999)}F1Z{rng.randint(1, 9)}',
+    }
+
+
+def invoice_payload(item_count, seed=0):
+    """A /api/generate-invoice payload with item_count line items, reproducible per seed."""
+    rng = random.Random(seed)
+    return {
+        'invoice_number': f'FHC/{seed:06d}',
+        'invoice_date': '2025-03-31',
+        'po_number': f'PO-{rng.randint(1000, 9999)}',
+        'agreement': None,
+        'cgst_rate': 9,
+        'sgst_rate': 9,
+        'igst_rate': 18,
+        'company_info': company(),
+        'buyer_info': buyer(seed),
+        'items': [
+            {
+                'description': rng.choice(PRODUCTS),
+                'hsn_code': str(rng.choice([3004, 4015, 9025, 3808, 6307])),
+                'quantity': rng.randint(1, 50),
+                'rate': round(rng.uniform(5, 5000), 2),
+            }
+            for _ in range(item_count)
+        ],
+        'discount_type': rng.choice(['none', 'percentage', 'amount']),
+        'discount_value': rng.choice([0, 5, 10]),
+        'shipping_charges': rng.choice([0, 50, 150]),
+    }
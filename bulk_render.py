@@ -0,0 +1,213 @@
+"""
+Render a JSONL file of /api/generate-invoice payloads to PDFs without HTTP.
+
+    python bulk_render.py invoices.jsonl -o out/ --workers 8
+
+Each line is one payload (or an object with the payload under "payload").
+Lines are read one at a time and rendered on a process pool with a bounded
+number in flight, so memory does not grow with the size of the input.
+PDFs are named <line>_Invoice_<number>.pdf, so invoices that share a
+number never overwrite each other. Progress is checkpointed to
+<output>/.checkpoint.json whenever renders complete; re-running the same
+command resumes after the last completed line. Only renders that were
+still in flight when a run was killed are done again, and they rewrite
+the same files. Failures are appended to <output>/errors.jsonl.
+"""
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+
+from invoice_generator import render_invoice, invoice_filename
+from invoice_schema import InvoiceSchema
+
+
+CHECKPOINT_NAME = '.checkpoint.json'
+ERRORS_NAME = 'errors.jsonl'
+
+invoice_schema = InvoiceSchema()
+
+
+def output_filename(line_no, invoice_number):
+    # The line number keeps repeated invoice numbers apart and sorts in input order
+    return f'{line_no + 1:06d}_{invoice_filename(invoice_number)}'
+
+
+def render_line(line_no, raw, output_dir, logo_path):
+    """
+    Worker: decode and parse one JSONL line, render it and write the PDF.
+    Returns (line_no, filename, error).
+    """
+    try:
+        record = json.loads(raw.decode('utf-8'))
+        data = record['payload'] if isinstance(record.get('payload'), dict) else record
+        data = invoice_schema.validate(data)
+        filename = output_filename(line_no, data['invoice_number'])
+        path = os.path.join(output_dir, filename)
+
+        # Write under a temporary name so an interrupted run never leaves half a PDF
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        render_invoice(data, output_filename=tmp_path, logo_path=logo_path)
+        os.replace(tmp_path, path)
+        return line_no, filename, None
+    except Exception as e:
+        return line_no, None, f'{type(e).__name__}: {e}'
+
+
+def _ignore_sigint():
+    # Ctrl-C is handled by the parent, which lets in-flight renders finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class Checkpoint:
+    """
+    Resume point for a run. Everything before `line` (starting at byte
+    `offset`) is finished; `done_ahead` holds lines past it that finished
+    out of order. Only the in-flight window is ever kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.line = 0
+        self.offset = 0
+        self.done_ahead = set()
+        self._end_offsets = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        self.line = state['line']
+        self.offset = state['offset']
+        self.done_ahead = set(state['done_ahead'])
+        return True
+
+    def track(self, line_no, end_offset):
+        self._end_offsets[line_no] = end_offset
+
+    def complete(self, line_no):
+        self.done_ahead.add(line_no)
+        # Advance the watermark over every contiguous finished line
+        while self.line in self.done_ahead:
+            self.done_ahead.discard(self.line)
+            self.offset = self._end_offsets.pop(self.line)
+            self.line += 1
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump({
+                'line': self.line,
+                'offset': self.offset,
+                'done_ahead': sorted(self.done_ahead),
+            }, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+
+def read_lines(path, start_line, start_offset):
+    """
+    Yield (line_no, end_offset, raw bytes) for each line from a resume point.
+    Lines are decoded by the worker, so one bad line only fails itself.
+    """
+    with open(path, 'rb') as input_file:
+        input_file.seek(start_offset)
+        line_no, offset = start_line, start_offset
+        for raw in input_file:
+            offset += len(raw)
+            yield line_no, offset, raw
+            line_no += 1
+
+
+def run(input_path, output_dir, workers, logo_path=None, progress_every=5.0, restart=False):
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, CHECKPOINT_NAME))
+    if not restart and checkpoint.load():
+        print(f'Resuming from line {checkpoint.line + 1}', flush=True)
+
+    rendered = failed = 0
+    started = last_report = time.perf_counter()
+    max_in_flight = workers * 4
+
+    def report(final=False):
+        elapsed = time.perf_counter() - started
+        rate = rendered / elapsed if elapsed else 0.0
+        label = 'Done' if final else 'Progress'
+        print(f'{label}: {rendered} rendered, {failed} failed, {rate:.1f} invoices/sec', flush=True)
+
+    with open(os.path.join(output_dir, ERRORS_NAME), 'a') as errors_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_ignore_sigint) as pool:
+        pending = set()
+
+        def collect(done):
+            nonlocal rendered, failed
+            for future in done:
+                line_no, _, error = future.result()
+                if error is None:
+                    rendered += 1
+                else:
+                    failed += 1
+                    errors_file.write(json.dumps({'line': line_no + 1, 'error': error}) + '\n')
+                checkpoint.complete(line_no)
+            # Saved on every completion, so a hard kill only loses in-flight renders
+            errors_file.flush()
+            checkpoint.save()
+
+        try:
+            for line_no, end_offset, raw in read_lines(input_path, checkpoint.line, checkpoint.offset):
+                checkpoint.track(line_no, end_offset)
+                # Blank lines and lines finished before an interruption are skipped
+                if not raw.strip() or line_no in checkpoint.done_ahead:
+                    checkpoint.complete(line_no)
+                    continue
+
+                pending.add(pool.submit(render_line, line_no, raw, output_dir, logo_path))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+                now = time.perf_counter()
+                if now - last_report >= progress_every:
+                    report()
+                    last_report = now
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            done, _ = wait(pending)
+            collect(future for future in done if not future.cancelled())
+            errors_file.flush()
+            checkpoint.save()
+            report()
+            print('Interrupted; re-run the same command to resume', flush=True)
+            return 130
+
+        errors_file.flush()
+        checkpoint.save()
+
+    report(final=True)
+    return 0 if failed == 0 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a JSONL file of invoice payloads to PDFs')
+    parser.add_argument('input', help='JSONL file, one invoice payload per line')
+    parser.add_argument('-o', '--output', default='invoices', help='Directory for the generated PDFs')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help='Render processes')
+    parser.add_argument('--logo', default=os.environ.get('INVOICE_LOGO_PATH'), help='Logo image path')
+    parser.add_argument('--progress-every', type=float, default=5.0, help='Seconds between progress lines')
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start from the top')
+    args = parser.parse_args(argv)
+
+    return run(args.input, args.output, args.workers, logo_path=args.logo,
+               progress_every=args.progress_every, restart=args.restart)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Direct-canvas renderer for standard one-page invoices.
+
+Draws the same layout as InvoiceGenerator (header bar, company block,
+BILL TO/SHIP TO, items grid, totals, signatory) at fixed coordinates,
+skipping platypus flowables, wrap and split entirely. Coordinates mirror
+the platypus result: frame, table paddings, style leadings and spacers
+are the ones InvoiceGenerator uses, and text is broken into lines by
+Paragraph.breakLines itself. plan() returns False whenever an invoice
+might not lay out identically (more than one page, more than
+MAX_FAST_ITEMS items, markup in text) and the caller falls back to
+InvoiceGenerator.
+"""
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+import io
+import os
+
+from invoice_generator import (
+    InvoiceGenerator, ITEM_COL_WIDTHS, draw_header, draw_footer, totals_rows,
+)
+
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+# SimpleDocTemplate margins plus the frame's 6pt padding
+FRAME_X = 40 + 6
+FRAME_WIDTH = PAGE_WIDTH - 80 - 12
+FRAME_TOP = 70 + 6
+FRAME_BOTTOM = PAGE_HEIGHT - 50 - 6
+
+# Standard invoices only; anything bigger goes through platypus
+MAX_FAST_ITEMS = 15
+
+HALF_WIDTH = 3.25 * inch
+TOTALS_LEFT_WIDTH = 3.25 * inch
+TOTALS_RIGHT_WIDTH = 2.75 * inch
+TOTALS_TABLE_WIDTHS = (1.8 * inch, 1 * inch)
+
+SPACE_AFTER_LOGO = 0.15 * inch
+SPACE_AFTER_DETAILS = 0.25 * inch
+SPACE_AFTER_PARTIES = 0.3 * inch
+SPACE_AFTER_ITEMS = 0.2 * inch
+SPACE_AFTER_TOTALS = 0.4 * inch
+SPACE_AFTER_NOTES = 0.2 * inch
+DETAIL_SPACER = 0.15 * inch
+LOGO_SIZE = 0.4 * inch
+
+NOTES_TEXT = 'THIS IS A COMPUTER GENERATED INVOICE THUS SIGNATURE MAY NOT BE REQUIRED'
+
+
+class DoesNotFit(Exception):
+    pass
+
+
+def _clean(text):
+    # Paragraph collapses all whitespace and interprets markup
+    text = str(text)
+    if '<' in text or '&' in text:
+        raise DoesNotFit('text contains markup')
+    return ' '.join(text.split())
+
+
+class _Text:
+    """A paragraph laid out like platypus would: wrapped lines, leading, spacing."""
+
+    def __init__(self, text, style, width):
+        self.font = style.fontName
+        self.size = style.fontSize
+        self.leading = style.leading
+        self.color = style.textColor
+        self.space_before = style.spaceBefore
+        self.space_after = style.spaceAfter
+        # Broken exactly where the Paragraph would break; an empty one has no lines
+        para_lines = Paragraph(_clean(text), style).breakLines([width]).lines
+        self.lines = [' '.join(words) for _, words in para_lines]
+        self.height = len(self.lines) * self.leading
+
+    def fits_one_line(self):
+        return len(self.lines) <= 1
+
+
+def _part_height(part):
+    # Spacers are plain numbers in the column lists
+    return part if isinstance(part, (int, float)) else part.height
+
+
+def _space_before(part):
+    return 0 if isinstance(part, (int, float)) else part.space_before
+
+
+def _space_after(part):
+    return 0 if isinstance(part, (int, float)) else part.space_after
+
+
+def _column_height(parts):
+    """Height of a cell holding a list of flowables (Table._listCellGeom)."""
+    total = sum(_part_height(part) + _space_before(part) + _space_after(part) for part in parts)
+    return total - _space_before(parts[0]) - _space_after(parts[-1])
+
+
+class CanvasInvoiceRenderer:
+    """
+    One-page invoice drawn straight onto a canvas. Mirrors the
+    InvoiceGenerator attributes callers use: output_filename,
+    page_count and get_pdf_bytes().
+    """
+
+    def __init__(self, template, output_filename=None, generated_on=None, reproducible=False):
+        if output_filename is None:
+            output_filename = io.BytesIO()
+        self.output_filename = output_filename
+        self.template = template
+        self.generated_on = generated_on
+        self.reproducible = reproducible
+        self.page_count = 1
+        self._ops = []
+
+    def plan(self, data, totals):
+        """Lay out the invoice; returns False if it must go through platypus."""
+        if len(data['items']) > MAX_FAST_ITEMS:
+            return False
+        try:
+            self._ops = []
+            y = FRAME_TOP
+            y = self._plan_logo(y)
+            y = self._plan_details(y, data)
+            y = self._plan_parties(y, data['company_info'], data['buyer_info'])
+            y = self._plan_items(y, data['items'], totals.line_amounts)
+            y = self._plan_totals(y, totals)
+            y = self._plan_notes(y)
+        except (DoesNotFit, KeyError, TypeError, ValueError):
+            self._ops = []
+            return False
+        if y > FRAME_BOTTOM:
+            self._ops = []
+            return False
+        return True
+
+    def _text(self, parts_top, x, part):
+        """Queue a paragraph's lines; the first baseline sits fontSize below its top."""
+        baseline = parts_top + part.size
+        for line in part.lines:
+            self._ops.append(('text', x, baseline, line, part.font, part.size, part.color))
+            baseline += part.leading
+
+    def _column(self, top, x, parts):
+        y = top
+        for index, part in enumerate(parts):
+            if index:
+                y += _space_before(part)
+            if not isinstance(part, (int, float)):
+                self._text(y, x, part)
+            y += _part_height(part) + _space_after(part)
+        return y
+
+    def _plan_logo(self, y):
+        if self.template.logo is None:
+            return y
+        x = FRAME_X + (FRAME_WIDTH - LOGO_SIZE) / 2
+        self._ops.append(('image', x, y, LOGO_SIZE, LOGO_SIZE))
+        return y + LOGO_SIZE + SPACE_AFTER_LOGO
+
+    def _plan_details(self, y, data):
+        t = self.template
+        company_info = data['company_info']
+        width = HALF_WIDTH - 12
+        table_x = FRAME_X + (FRAME_WIDTH - 2 * HALF_WIDTH) / 2
+
+        left = [
+            _Text(company_info['name'], t.heading_style, width),
+            _Text(company_info['address'], t.small_style, width),
+            _Text(f"{company_info['city']}, {company_info['state']}. {company_info['pincode']}", t.small_style, width),
+            _Text(f"GST NO: {company_info['gstin']}", t.small_style, width),
+            _Text(company_info['email'], t.small_style, width),
+        ]
+
+        date = _Text(InvoiceGenerator._format_date(data['invoice_date']), t.normal_style, width)
+        if not date.fits_one_line():
+            raise DoesNotFit('date wraps')
+        right = [date, DETAIL_SPACER, _Text(f"INVOICE {data['invoice_number']}", t.invoice_value_style, width)]
+        for label, key in (('PO NUMBER', 'po_number'), ('AGREEMENT', 'agreement')):
+            if data.get(key):
+                right += [DETAIL_SPACER, _Text(label, t.invoice_label_style, width),
+                          _Text(data[key], t.normal_style, width)]
+
+        top = y + 3
+        self._column(top, table_x + 6, left)
+        self._column(top, table_x + HALF_WIDTH + 6, right)
+
+        # Underlined date, as Paragraph draws <u>
+        date_width = stringWidth(date.lines[0], date.font, date.size)
+        underline_y = top + date.size + 0.125 * date.size
+        self._ops.append(('line', table_x + HALF_WIDTH + 6, underline_y,
+                          table_x + HALF_WIDTH + 6 + date_width, underline_y, 1, date.color))
+
+        height = max(_column_height(left), _column_height(right)) + 6
+        return y + height + SPACE_AFTER_DETAILS
+
+    def _plan_parties(self, y, seller_info, buyer_info):
+        t = self.template
+        width = HALF_WIDTH - 24
+        table_x = FRAME_X + (FRAME_WIDTH - 2 * HALF_WIDTH) / 2
+
+        def party_text(info):
+            return f"{info['name']} {info['address']} {info['city']}, {info['state']} - {info['pincode']}"
+
+        rows = [
+            (_Text('BILL TO', t.heading_style, width), _Text('SHIP TO', t.heading_style, width)),
+            (_Text(party_text(seller_info), t.normal_style, width), _Text(party_text(buyer_info), t.normal_style, width)),
+            (_Text(f"GST NUMBER: {seller_info['gstin']}", t.normal_style, width),
+             _Text(f"GST NUMBER: {buyer_info.get('gstin', 'N/A')}", t.normal_style, width)),
+        ]
+
+        top = y
+        row_bottoms = []
+        for left, right in rows:
+            self._text(top + 8, table_x + 12, left)
+            self._text(top + 8, table_x + HALF_WIDTH + 12, right)
+            top += max(left.height, right.height) + 16
+            row_bottoms.append(top)
+
+        table_width = 2 * HALF_WIDTH
+        self._ops.append(('line', table_x, row_bottoms[0], table_x + table_width, row_bottoms[0], 1.5, colors.grey))
+        self._ops.append(('box', table_x, y, table_width, top - y, 1, colors.grey))
+        return top + SPACE_AFTER_PARTIES
+
+    def _plan_items(self, y, items, line_amounts):
+        t = self.template
+        table_width = sum(ITEM_COL_WIDTHS)
+        table_x = FRAME_X + (FRAME_WIDTH - table_width) / 2
+        col_x = [table_x]
+        for col_width in ITEM_COL_WIDTHS:
+            col_x.append(col_x[-1] + col_width)
+
+        rows = [[_Text(label, t.table_header_style, col_width - 12)
+                 for label, col_width in zip(('S.No', 'Name of Product', 'HSN/SAC', 'Qty', 'Rate', 'Amount'),
+                                             ITEM_COL_WIDTHS)]]
+        for idx, (item, amount) in enumerate(zip(items, line_amounts), 1):
+            values = (str(idx), item['description'], item.get('hsn_code', ''),
+                      f'{int(item["quantity"])}', f'{item["rate"]:.2f}', f'{amount:.2f}')
+            rows.append([_Text(value, t.normal_style, col_width - 12)
+                         for value, col_width in zip(values, ITEM_COL_WIDTHS)])
+
+        # Rows are as tall as their tallest cell; the others are centred (VALIGN MIDDLE)
+        row_tops = [y]
+        for row in rows:
+            row_tops.append(row_tops[-1] + max(cell.height for cell in row) + 16)
+        table_height = row_tops[-1] - y
+
+        self._ops.append(('fill', table_x, y, table_width, row_tops[1] - y, t.table_header_color))
+        self._ops.append(('fill', table_x, row_tops[1], table_width, row_tops[-1] - row_tops[1],
+                          t.table_body_color))
+
+        for row, top, bottom in zip(rows, row_tops, row_tops[1:]):
+            inner = bottom - top - 16
+            for cell, x in zip(row, col_x):
+                self._text(top + 8 + (inner - cell.height) / 2, x + 6, cell)
+
+        grid = []
+        for row_y in row_tops:
+            grid.append((table_x, row_y, table_x + table_width, row_y))
+        for x in col_x:
+            grid.append((x, y, x, y + table_height))
+        self._ops.append(('grid', grid, 1, colors.grey))
+        return y + table_height + SPACE_AFTER_ITEMS
+
+    def _plan_totals(self, y, totals):
+        t = self.template
+        table_x = FRAME_X + (FRAME_WIDTH - TOTALS_LEFT_WIDTH - TOTALS_RIGHT_WIDTH) / 2
+        top = y + 3
+
+        words = InvoiceGenerator._number_to_words(totals.total_amount)
+        heading = _Text('TOTAL AMOUNT IN WORDS:', t.normal_style, TOTALS_LEFT_WIDTH - 12)
+        amount_words = _Text(words, t.normal_style, TOTALS_LEFT_WIDTH - 12)
+        heading.lines += amount_words.lines
+        heading.height = len(heading.lines) * heading.leading
+        self._text(top, table_x + 6, heading)
+
+        label_width, value_width = TOTALS_TABLE_WIDTHS
+        right_width = label_width + value_width
+        # The nested table is right aligned inside its padded cell
+        right_x = table_x + TOTALS_LEFT_WIDTH + TOTALS_RIGHT_WIDTH - 6 - right_width
+
+        rows = [(_Text(label, t.normal_style, label_width - 12), _Text(value, t.normal_style, value_width - 12))
+                for label, value in totals_rows(**totals.add_totals_kwargs())]
+        rows.append((_Text('TOTAL', t.grand_total_style, label_width - 12),
+                     _Text(f'{totals.total_amount:.2f}', t.grand_total_style, value_width - 12)))
+        if not all(cell.fits_one_line() for row in rows for cell in row):
+            raise DoesNotFit('totals cell wraps')
+
+        row_top = top
+        for index, (label, value) in enumerate(rows):
+            if index == len(rows) - 1:
+                self._ops.append(('line', right_x, row_top, right_x + right_width, row_top, 2, colors.black))
+            self._text(row_top + 6, right_x + 6, label)
+            self._text(row_top + 6, right_x + label_width + 6, value)
+            row_top += max(label.height, value.height) + 12
+
+        height = max(heading.height, row_top - top) + 6
+        return y + height + SPACE_AFTER_TOTALS
+
+    def _plan_notes(self, y):
+        t = self.template
+        table_x = FRAME_X + (FRAME_WIDTH - 2 * HALF_WIDTH) / 2
+        left = _Text(NOTES_TEXT, t.normal_style, HALF_WIDTH - 12)
+        right = _Text(t.signatory_text, t.normal_style, HALF_WIDTH - 12)
+        self._text(y + 3, table_x + 6, left)
+        self._text(y + 3, table_x + HALF_WIDTH + 6, right)
+        y += max(left.height, right.height) + 6 + SPACE_AFTER_NOTES
+
+        signatory = _Text('AUTHORIZED SIGNATORY', t.heading_style, FRAME_WIDTH)
+        y += signatory.space_before
+        self._text(y, FRAME_X, signatory)
+        return y + signatory.height
+
+    def generate(self):
+        c = canvas.Canvas(self.output_filename, pagesize=A4,
+                          invariant=1 if self.reproducible else None)
+        draw_header(c, self.template)
+        draw_footer(c, self.template, self.generated_on)
+
+        current_font = None
+        current_fill = None
+        for op in self._ops:
+            kind = op[0]
+            if kind == 'text':
+                _, x, y, text, font, size, color = op
+                if (font, size) != current_font:
+                    c.setFont(font, size)
+                    current_font = (font, size)
+                if color != current_fill:
+                    c.setFillColor(color)
+                    current_fill = color
+                c.drawString(x, PAGE_HEIGHT - y, text)
+            elif kind == 'fill':
+                _, x, y, width, height, color = op
+                c.setFillColor(color)
+                current_fill = color
+                c.rect(x, PAGE_HEIGHT - y - height, width, height, fill=1, stroke=0)
+            elif kind == 'line':
+                _, x1, y1, x2, y2, width, color = op
+                c.setLineWidth(width)
+                c.setStrokeColor(color)
+                c.line(x1, PAGE_HEIGHT - y1, x2, PAGE_HEIGHT - y2)
+            elif kind == 'grid':
+                _, segments, width, color = op
+                c.setLineWidth(width)
+                c.setStrokeColor(color)
+                c.lines([(x1, PAGE_HEIGHT - y1, x2, PAGE_HEIGHT - y2) for x1, y1, x2, y2 in segments])
+            elif kind == 'box':
+                _, x, y, width, height, line_width, color = op
+                c.setLineWidth(line_width)
+                c.setStrokeColor(color)
+                c.rect(x, PAGE_HEIGHT - y - height, width, height, fill=0, stroke=1)
+            elif kind == 'image':
+                _, x, y, width, height = op
+                c.drawImage(self.template.logo, x, PAGE_HEIGHT - y - height, width, height, mask='auto')
+
+        c.showPage()
+        c.save()
+        return self.output_filename
+
+    def get_pdf_bytes(self):
+        if isinstance(self.output_filename, (str, os.PathLike)):
+            with open(self.output_filename, 'rb') as pdf_file:
+                return pdf_file.read()
+        return self.output_filename.getvalue()
@@ -0,0 +1,97 @@
+"""
+Production server settings:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Worker processes are pre-forked, and each one renders a throwaway invoice
+through both engines before it accepts traffic so ReportLab, fonts,
+styles and the logo are already loaded. Workers are recycled after
+MAX_REQUESTS requests (with jitter so they do not all restart together).
+
+Each worker is a separate process. Background jobs (JOBS_DB), the
+metrics behind /metrics (METRICS_DIR, a fresh temporary directory unless
+set) and the disk tier of the PDF cache (PDF_CACHE_DIR, off unless set)
+are shared by all of them. Per-worker state remains:
+- the memory tier of the PDF cache
+- the template and section caches
+
+/health carries the answering worker's pid. Its admission figures cover
+the whole server when the app is preloaded.
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# A sync worker only accepts a connection once it is idle, so a burst waits
+# unseen in the listen backlog and admission control never rejects anything.
+# Threads let each worker accept more requests than it renders; the extra
+# ones queue in the admission controller or get a quick 503
+threads = int(os.environ.get('WEB_THREADS', 4))
+# gthread, except that a worker due for recycling stops accepting connections
+worker_class = 'gunicorn_worker.RecyclingThreadWorker' if threads > 1 else 'sync'
+
+# Recycle workers to cap slow memory growth; 0 disables recycling
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+
+# Import the app (and ReportLab) once in the master so forked workers share it
+preload_app = os.environ.get('PRELOAD_APP', '1').lower() in ('1', 'true', 'yes')
+
+# Renders are CPU-bound and hold the GIL, so one per worker process. With
+# preloading the admission controller is created in the master and shared by
+# every worker, so these limits cover the whole server; otherwise each
+# worker has its own
+render_slots = workers if preload_app else 1
+os.environ.setdefault('MAX_CONCURRENT_RENDERS', str(render_slots))
+os.environ.setdefault('MAX_QUEUED_RENDERS', str(render_slots))
+
+accesslog = '-'
+
+# Workers write their metrics here and /metrics sums them. Without
+# METRICS_DIR a fresh temporary directory is made and removed on exit; a
+# directory the operator names is kept, and only metrics files left in it
+# by an earlier server are deleted so counts start from zero
+owns_metrics_dir = 'METRICS_DIR' not in os.environ
+if owns_metrics_dir:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='invoice-metrics-')
+else:
+    for stale_path in glob.glob(os.path.join(os.environ['METRICS_DIR'], 'metrics-*.json')):
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+
+def on_starting(server):
+    # app.py loads ReportLab on first render; with preloading, load it in the
+    # master as well so workers inherit it instead of importing it each
+    if preload_app:
+        import invoice_generator  # noqa: F401
+
+
+def post_fork(server, worker):
+    # Runs in the new worker before it starts accepting connections
+    from app import job_queue, warm_up
+    seconds = warm_up()
+    # Every worker drains the shared job queue, not just those that take submissions
+    job_queue.start()
+    server.log.info(f'Worker {worker.pid} warmed up in {seconds * 1000:.0f} ms')
+
+
+def worker_exit(server, worker):
+    # Workers write their metrics at most once a second; keep the last ones
+    import metrics
+    metrics.registry.dump()
+
+
+def on_exit(server):
+    if owns_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -0,0 +1,17 @@
+from gunicorn.workers.gthread import ThreadWorker
+
+
+class RecyclingThreadWorker(ThreadWorker):
+    """
+    gunicorn's threaded worker, minus a dropped request on recycling.
+
+    The stock worker marks itself for restart as soon as its max_requests-th
+    request starts, but its event loop only notices after the current poll:
+    a connection it accepts in between is closed unanswered when the loop
+    ends. Once a restart is due this worker stops accepting, so the
+    connection stays in the listen backlog for another worker.
+    """
+
+    def accept(self, server, listener):
+        if self.alive:
+            super().accept(server, listener)
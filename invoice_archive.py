@@ -0,0 +1,208 @@
+from contextlib import contextmanager
+from datetime import datetime
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process servers only
+    fcntl = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY,
+    invoice_number TEXT NOT NULL,
+    buyer_gstin TEXT,
+    buyer_name TEXT,
+    invoice_date TEXT,
+    total TEXT,
+    total_paise INTEGER,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    sha256 TEXT NOT NULL UNIQUE,
+    archived_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices (invoice_number);
+CREATE INDEX IF NOT EXISTS idx_invoices_buyer_date ON invoices (buyer_gstin, invoice_date);
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices (invoice_date);
+CREATE INDEX IF NOT EXISTS idx_invoices_total ON invoices (total_paise);
+CREATE TABLE IF NOT EXISTS archive_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    invoices INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO archive_stats (id, invoices, bytes)
+    SELECT 1, COUNT(*), COALESCE(SUM(length), 0) FROM invoices
+    WHERE NOT EXISTS (SELECT 1 FROM archive_stats);
+"""
+
+COLUMNS = (
+    'id', 'invoice_number', 'buyer_gstin', 'buyer_name', 'invoice_date', 'total',
+    'segment', 'offset', 'length', 'sha256', 'archived_at',
+)
+
+
+class InvoiceArchive:
+    """
+    Write-once store for generated PDFs. PDFs are appended to segment files
+    (seg-000001.dat, ...) that roll over at max_segment_bytes, and a SQLite
+    index maps invoice number, buyer GSTIN, date and total to the segment
+    and byte range holding each PDF, so a lookup is one indexed query and
+    serving a PDF is a seek and a read.
+    """
+
+    def __init__(self, directory, max_segment_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._lock_path = os.path.join(directory, 'archive.lock')
+
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), timeout=30)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f'seg-{segment:06d}.dat')
+
+    def _current_segment(self, connection):
+        row = connection.execute('SELECT MAX(segment) FROM invoices').fetchone()
+        return row[0] or 1
+
+    @contextmanager
+    def _exclusive(self):
+        # Threads in this process, then other processes sharing the directory
+        with self._write_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def store(self, pdf_bytes, data, totals=None):
+        """Archive a PDF once; storing identical bytes again returns the existing id."""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        connection = self._connection()
+
+        existing = connection.execute('SELECT id FROM invoices WHERE sha256 = ?', (digest,)).fetchone()
+        if existing:
+            return existing['id']
+
+        buyer_info = data.get('buyer_info') or {}
+        total = totals.total_amount if totals is not None else None
+
+        with self._exclusive():
+            existing = connection.execute('SELECT id FROM invoices WHERE sha256 = ?', (digest,)).fetchone()
+            if existing:
+                return existing['id']
+
+            segment = self._current_segment(connection)
+            path = self._segment_path(segment)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size and size + len(pdf_bytes) > self.max_segment_bytes:
+                segment += 1
+                path = self._segment_path(segment)
+                size = 0
+
+            with open(path, 'ab') as segment_file:
+                segment_file.write(pdf_bytes)
+                segment_file.flush()
+                os.fsync(segment_file.fileno())
+
+            with connection:
+                cursor = connection.execute(
+                    'INSERT INTO invoices (invoice_number, buyer_gstin, buyer_name, invoice_date, total,'
+                    ' total_paise, segment, offset, length, sha256, archived_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        str(data.get('invoice_number')),
+                        (buyer_info.get('gstin') or '').strip().upper() or None,
+                        buyer_info.get('name'),
+                        data.get('invoice_date'),
+                        str(total) if total is not None else None,
+                        int(total * 100) if total is not None else None,
+                        segment, size, len(pdf_bytes), digest,
+                        datetime.now().isoformat(timespec='seconds'),
+                    )
+                )
+                # Running totals, so stats() does not scan the index
+                connection.execute(
+                    'UPDATE archive_stats SET invoices = invoices + 1, bytes = bytes + ? WHERE id = 1',
+                    (len(pdf_bytes),)
+                )
+            return cursor.lastrowid
+
+    def find(self, invoice_number=None, buyer_gstin=None, date_from=None, date_to=None,
+             min_total=None, max_total=None, limit=100, offset=0):
+        """
+        Newest first, filtered on any combination of the indexed fields.
+        min_total and max_total are inclusive rupee amounts.
+        """
+        clauses, params = [], []
+        if invoice_number:
+            clauses.append('invoice_number = ?')
+            params.append(invoice_number)
+        if buyer_gstin:
+            clauses.append('buyer_gstin = ?')
+            params.append(buyer_gstin.strip().upper())
+        if date_from:
+            clauses.append('invoice_date >= ?')
+            params.append(date_from)
+        if date_to:
+            clauses.append('invoice_date <= ?')
+            params.append(date_to)
+        if min_total is not None:
+            clauses.append('total_paise >= ?')
+            params.append(math.ceil(min_total * 100))
+        if max_total is not None:
+            clauses.append('total_paise <= ?')
+            params.append(math.floor(max_total * 100))
+
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT {", ".join(COLUMNS)} FROM invoices {where} ORDER BY id DESC LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, archive_id):
+        row = self._connection().execute(
+            f'SELECT {", ".join(COLUMNS)} FROM invoices WHERE id = ?', (archive_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def read(self, record, start=0, stop=None):
+        """Bytes [start, stop) of an archived PDF, read straight from its segment."""
+        if stop is None or stop > record['length']:
+            stop = record['length']
+        fd = os.open(self._segment_path(record['segment']), os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            if hasattr(os, 'pread'):
+                return os.pread(fd, stop - start, record['offset'] + start)
+            os.lseek(fd, record['offset'] + start, os.SEEK_SET)
+            return os.read(fd, stop - start)
+        finally:
+            os.close(fd)
+
+    def stats(self):
+        row = self._connection().execute('SELECT invoices, bytes FROM archive_stats WHERE id = 1').fetchone()
+        return {'invoices': row['invoices'], 'bytes': row['bytes']}
@@ -1,132 +1,457 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable, PageBreak, Image
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-from reportlab.platypus import Image
+from invoice_templates import registry, tenant_key
+from invoice_layout import (
+    ITEM_COL_WIDTHS, ITEM_CELL_H_PADDING, ITEM_CELL_V_PADDING, HIGH_VOLUME_ITEMS, HEADER_ROW_HEIGHT,
+    PLAIN_ROW_HEIGHT, TOP_MARGIN, BOTTOM_MARGIN, SIDE_MARGIN, PARTY_COL_WIDTH, PARTY_CELL_H_PADDING
+)
+import invoice_totals
+from metrics import NULL_TIMER
+from collections import OrderedDict
+from functools import partial
 import os
+import io
+import threading
 from datetime import datetime
 
 
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+PAGE_FURNITURE_FORM = 'InvoicePageFurniture'
+
+
+class CachedImage(Image):
+    """Image flowable backed by an already decoded ImageReader."""
+    
+    def __init__(self, reader, width=None, height=None, **kwargs):
+        self._img = reader
+        super().__init__(io.BytesIO(), width=width, height=height, **kwargs)
+
+
+class PagedItemsTable(Flowable):
+    """
+    Items table that only builds a real Table for the rows that fit on the
+    current page. Each split hands the frame one page-sized Table with the
+    header row on top and keeps the remaining rows for the next page, so
+    no page ever re-measures the whole table.
+    """
+    
+    def __init__(self, header, rows, row_heights, col_widths, style):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.row_heights = row_heights
+        self.col_widths = col_widths
+        self.style = style
+        self._table = None
+        # Placed like the Tables it hands out when it is drawn whole
+        self.hAlign = 'CENTER'
+    
+    def _build(self, count):
+        table = Table([self.header] + self.rows[:count], colWidths=self.col_widths, repeatRows=1)
+        table.setStyle(self.style)
+        return table
+    
+    def _rows_fitting(self, available_height):
+        used = HEADER_ROW_HEIGHT
+        for count, row_height in enumerate(self.row_heights):
+            used += row_height
+            if used > available_height:
+                return count
+        return len(self.rows)
+    
+    def _fitted_table(self, availWidth, availHeight):
+        # Row heights are estimates; measure the real table and back off
+        count = self._rows_fitting(availHeight)
+        while count > 0:
+            table = self._build(count)
+            width, height = table.wrap(availWidth, availHeight)
+            if height <= availHeight:
+                return count, table, width, height
+            count -= 1
+        return 0, None, 0, 0
+    
+    def wrap(self, availWidth, availHeight):
+        estimated = HEADER_ROW_HEIGHT + sum(self.row_heights)
+        if estimated <= availHeight:
+            self._table = self._build(len(self.rows))
+            self.width, self.height = self._table.wrap(availWidth, availHeight)
+        else:
+            self._table = None
+            self.width, self.height = sum(self.col_widths), estimated
+        return self.width, self.height
+    
+    def split(self, availWidth, availHeight):
+        count, table, _, _ = self._fitted_table(availWidth, availHeight)
+        if count == 0:
+            return []
+        if count == len(self.rows):
+            return [table]
+        rest = PagedItemsTable(
+            self.header, self.rows[count:], self.row_heights[count:], self.col_widths, self.style
+        )
+        return [table, rest]
+    
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
+
+class StreamedItemsTable(Flowable):
+    """
+    Items table whose rows come from an iterator of (row, row_height).
+    Like PagedItemsTable it hands the frame one page-sized Table per
+    split, but it never knows how many rows are left: it reads just
+    enough to fill the current page and keeps any row that did not fit
+    for the next one.
+    """
+    
+    def __init__(self, header, rows, col_widths, style, pending=None):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.col_widths = col_widths
+        self.style = style
+        self._pending = pending if pending is not None else []
+    
+    def _take(self, available_height):
+        """Rows (and heights) for one page, reading more from the iterator as needed."""
+        taken = []
+        used = HEADER_ROW_HEIGHT
+        while True:
+            if not self._pending:
+                row = next(self.rows, None)
+                if row is None:
+                    return taken, True
+                self._pending.append(row)
+            if used + self._pending[0][1] > available_height:
+                return taken, False
+            used += self._pending[0][1]
+            taken.append(self._pending.pop(0))
+    
+    def _build(self, rows):
+        table = Table([self.header] + [row for row, _ in rows], colWidths=self.col_widths, repeatRows=1)
+        table.setStyle(self.style)
+        return table
+    
+    def wrap(self, availWidth, availHeight):
+        # The remaining height is unknown, so always ask the frame to split
+        self.width = sum(self.col_widths)
+        self.height = availHeight + 1
+        return self.width, self.height
+    
+    def split(self, availWidth, availHeight):
+        rows, finished = self._take(availHeight)
+        # Row heights are estimates; measure the real table and back off
+        while rows:
+            table = self._build(rows)
+            if table.wrap(availWidth, availHeight)[1] <= availHeight:
+                break
+            self._pending.insert(0, rows.pop())
+            finished = False
+        if not rows:
+            return []
+        if finished:
+            return [table]
+        # A fresh flowable for the rest, as platypus marks postponed ones
+        rest = StreamedItemsTable(self.header, self.rows, self.col_widths, self.style, self._pending)
+        return [table, rest]
+    
+    def draw(self):
+        pass
+
+
+class DeferredSection(Flowable):
+    """
+    Stand-in for flowables that can only be built once everything before
+    them has been laid out (e.g. totals of a streamed items table). The
+    first time the frame reaches it, it splits into build()'s flowables.
+    """
+    
+    def __init__(self, build):
+        super().__init__()
+        self.build = build
+        self._flowables = None
+    
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = availWidth, availHeight + 1
+        return self.width, self.height
+    
+    def split(self, availWidth, availHeight):
+        if self._flowables is None:
+            self._flowables = self.build()
+        # The first flowable has to fit here, otherwise wait for the next frame
+        if self._flowables[0].wrap(availWidth, availHeight)[1] > availHeight:
+            return []
+        return self._flowables
+    
+    def draw(self):
+        pass
+
+
+class SectionLayout:
+    """
+    Flowables of one invoice section, built once and wrapped once per
+    available width. Several flowables are stacked the way a table cell
+    stacks a list. The lock is held while measuring and drawing, because
+    wrap and drawOn keep per-call state (the canvas) on the flowables.
+    """
+    
+    def __init__(self, build):
+        self.build = build
+        self.flowables = build()
+        self.lock = threading.Lock()
+        self._width = None
+        self._size = None
+        self._offsets = None
+    
+    def measure(self, availWidth, availHeight):
+        with self.lock:
+            if self._width != availWidth:
+                sizes = [flowable.wrap(availWidth, availHeight) for flowable in self.flowables]
+                if len(sizes) == 1:
+                    self._size = sizes[0]
+                    self._offsets = [0]
+                else:
+                    # Same arithmetic as Table._listCellGeom and Table._drawCell
+                    total = 0
+                    for flowable, (_, height) in zip(self.flowables, sizes):
+                        total += height + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+                    height = total - self.flowables[0].getSpaceBefore() - self.flowables[-1].getSpaceAfter()
+                    y = self.flowables[0].getSpaceBefore()
+                    self._offsets = []
+                    for flowable, (_, flowable_height) in zip(self.flowables, sizes):
+                        y -= flowable.getSpaceBefore() + flowable_height
+                        self._offsets.append(y)
+                        y -= flowable.getSpaceAfter()
+                    self._size = (max(width for width, _ in sizes), height)
+                self._width = availWidth
+            return self._size
+    
+    def drawOn(self, canvas, x, y, _sW=0):
+        with self.lock:
+            if len(self.flowables) == 1:
+                self.flowables[0].drawOn(canvas, x, y, _sW)
+                return
+            top = y + self._size[1]
+            for flowable, offset in zip(self.flowables, self._offsets):
+                flowable.drawOn(canvas, x, top + offset, _sW)
+
+
+class SectionCache:
+    """
+    Content keyed LRU of SectionLayouts, shared by every render in the
+    process so a seller or buyer block seen before is never rebuilt or
+    re-wrapped. max_size=0 disables caching.
+    """
+    
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._sections = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, build):
+        """Layout for key, calling build() for its flowables on a miss."""
+        if self.max_size <= 0:
+            return SectionLayout(build)
+        with self._lock:
+            layout = self._sections.get(key)
+            if layout is not None:
+                self._sections.move_to_end(key)
+                return layout
+        
+        # Build outside the lock; a concurrent duplicate build is harmless
+        layout = SectionLayout(build)
+        
+        with self._lock:
+            layout = self._sections.setdefault(key, layout)
+            self._sections.move_to_end(key)
+            while len(self._sections) > self.max_size:
+                self._sections.popitem(last=False)
+        return layout
+    
+    def clear(self):
+        with self._lock:
+            self._sections.clear()
+    
+    def __len__(self):
+        return len(self._sections)
+
+
+section_cache = SectionCache(max_size=int(os.environ.get('SECTION_CACHE_SIZE', 256)))
+
+
+class CachedSection(Flowable):
+    """
+    One render's placement of a shared SectionLayout. Measures from the
+    layout's cache and draws its flowables straight onto the canvas,
+    exactly where the uncached flowables would have gone.
+    """
+    
+    def __init__(self, layout):
+        super().__init__()
+        self.layout = layout
+        flowables = layout.flowables
+        if len(flowables) == 1:
+            self.hAlign = flowables[0].hAlign
+            self.spaceBefore = flowables[0].getSpaceBefore()
+            self.spaceAfter = flowables[0].getSpaceAfter()
+    
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = self.layout.measure(availWidth, availHeight)
+        return self.width, self.height
+    
+    def split(self, availWidth, availHeight):
+        # A fresh copy is split so the shared flowables never reach a frame
+        flowables = self.layout.build()
+        if len(flowables) != 1:
+            return []
+        flowables[0].wrap(availWidth, availHeight)
+        return flowables[0].split(availWidth, availHeight)
+    
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.layout.drawOn(canvas, x, y, _sW)
+
+
+def draw_header(canvas_obj, template):
+    canvas_obj.saveState()
+    page_width, page_height = A4
+    bar_height = 12
+    bar_y = page_height - 70
+    bar_x_start = 40
+    bar_x_end = page_width - 40
+    canvas_obj.setFillColor(template.header_color)
+    canvas_obj.rect(bar_x_start, bar_y, bar_x_end - bar_x_start, bar_height, fill=1, stroke=0)
+    canvas_obj.restoreState()
+
+
+def draw_footer(canvas_obj, template, generated_on=None):
+    canvas_obj.saveState()
+    page_width, page_height = A4
+    footer_bar_height = 12
+    footer_y = 40
+    bar_x_start = 40
+    bar_x_end = page_width - 40
+    canvas_obj.setFillColor(template.header_color)
+    canvas_obj.rect(bar_x_start, footer_y, bar_x_end - bar_x_start, footer_bar_height, fill=1, stroke=0)
+    canvas_obj.setFont("Helvetica", 8)
+    canvas_obj.setFillColor(template.footer_color)
+    generated_on = generated_on or datetime.now().strftime("%d/%m/%Y")
+    footer_text = template.footer_text.format(date=generated_on)
+    text_width = canvas_obj.stringWidth(footer_text, "Helvetica", 8)
+    canvas_obj.drawString((page_width - text_width) / 2, 2, footer_text)
+    canvas_obj.restoreState()
+
+
+def totals_rows(subtotal, discount_type, discount_value, discount_amount,
+                cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount,
+                shipping_amount, total_amount):
+    """(label, value) rows of the totals box, without the final TOTAL row."""
+    rows = [('SUBTOTAL', f'{subtotal:.2f}')]
+    
+    # Add discount row if applicable
+    if discount_amount > 0:
+        if discount_type == 'percentage':
+            rows.append((f'DISCOUNT ({discount_value}%)', f'-{discount_amount:.2f}'))
+        else:
+            rows.append(('DISCOUNT', f'-{discount_amount:.2f}'))
+        
+        subtotal_after_discount = subtotal - discount_amount
+        rows.append(('AFTER DISCOUNT', f'{subtotal_after_discount:.2f}'))
+    
+    # Add tax rows
+    if cgst_rate > 0:
+        rows.append((f'CGST ({cgst_rate}%)', f'{cgst_amount:.2f}'))
+    
+    if sgst_rate > 0:
+        rows.append((f'SGST ({sgst_rate}%)', f'{sgst_amount:.2f}'))
+    
+    if igst_rate > 0:
+        rows.append((f'IGST ({igst_rate}%)', f'{igst_amount:.2f}'))
+    
+    # Add shipping
+    rows.append(('SHIPPING/HANDLING', f'{shipping_amount:.2f}'))
+    return rows
+
+
 class InvoiceGenerator:
-    def __init__(self, output_filename=None, logo_path=None):
+    def __init__(self, output_filename=None, logo_path=None, template=None,
+                 generated_on=None, reproducible=False):
+        # output_filename may be a path or any writable binary stream.
+        # Without one the PDF is rendered into an in-memory buffer.
         if output_filename is None:
-            output_filename = f'invoice_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+            output_filename = io.BytesIO()
         
         self.output_filename = output_filename
         self.logo_path = logo_path
         
+        # Styles, logo and page furniture come from the cached seller template
+        if template is None:
+            template = registry.get(logo_path=logo_path)
+        self.template = template
+        
+        # Reproducible mode pins the footer date and PDF metadata
+        # (timestamps, document ID) so identical input gives identical bytes
+        self.generated_on = generated_on
+        self.reproducible = reproducible
+        
         self.doc = SimpleDocTemplate(
             output_filename, 
             pagesize=A4,
-            rightMargin=40, 
-            leftMargin=40,
-            topMargin=70,
-            bottomMargin=50
+            rightMargin=SIDE_MARGIN, 
+            leftMargin=SIDE_MARGIN,
+            topMargin=TOP_MARGIN,
+            bottomMargin=BOTTOM_MARGIN,
+            invariant=1 if reproducible else None
         )
         
         self.elements = []
-        self.styles = getSampleStyleSheet()
         self._setup_styles()
     
     def _setup_styles(self):
-        self.heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            textColor=colors.HexColor('#34495E'),
-            spaceAfter=12,
-            fontName='Helvetica-Bold'
-        )
-        
-        self.normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6
-        )
-        
-        self.small_style = ParagraphStyle(
-            'SmallNormal',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            spaceAfter=3
-        )
-        
-        self.table_header_style = ParagraphStyle(
-            'TableHeader',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            fontName='Helvetica-Bold',
-            textColor=colors.whitesmoke
-        )
-        
-        self.invoice_label_style = ParagraphStyle(
-            'InvoiceLabel',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor('#2C3E50')
-        )
-        
-        self.invoice_value_style = ParagraphStyle(
-            'InvoiceValue',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor('#2C3E50')
-        )
+        template = self.template
+        self.styles = template.styles
+        self.heading_style = template.heading_style
+        self.normal_style = template.normal_style
+        self.small_style = template.small_style
+        self.table_header_style = template.table_header_style
+        self.invoice_label_style = template.invoice_label_style
+        self.invoice_value_style = template.invoice_value_style
+        self.grand_total_style = template.grand_total_style
     
     def _add_header(self, canvas_obj, doc):
-        canvas_obj.saveState()
-        page_width, page_height = A4
-        bar_height = 12
-        bar_y = page_height - 70
-        bar_x_start = 40
-        bar_x_end = page_width - 40
-        canvas_obj.setFillColor(colors.HexColor('#B02415'))
-        canvas_obj.rect(bar_x_start, bar_y, bar_x_end - bar_x_start, bar_height, fill=1, stroke=0)
-        canvas_obj.restoreState()
+        draw_header(canvas_obj, self.template)
     
     def _add_footer(self, canvas_obj, doc):
-        canvas_obj.saveState()
-        page_width, page_height = A4
-        footer_bar_height = 12
-        footer_y = 40
-        bar_x_start = 40
-        bar_x_end = page_width - 40
-        canvas_obj.setFillColor(colors.HexColor('#B02415'))
-        canvas_obj.rect(bar_x_start, footer_y, bar_x_end - bar_x_start, footer_bar_height, fill=1, stroke=0)
-        canvas_obj.setFont("Helvetica", 8)
-        canvas_obj.setFillColor(colors.HexColor('#666666'))
-        footer_text = "© 2025 Fascino. All rights reserved. | Invoice Generated on " + datetime.now().strftime("%d/%m/%Y")
-        text_width = canvas_obj.stringWidth(footer_text, "Helvetica", 8)
-        canvas_obj.drawString((page_width - text_width) / 2, 2, footer_text)
-        canvas_obj.restoreState()
+        draw_footer(canvas_obj, self.template, self.generated_on)
     
     def add_logo_and_invoice_details(self, company_info, invoice_number, invoice_date, po_number=None, agreement=None):
 
-        if self.logo_path and os.path.exists(self.logo_path):
-            try:
-                # Small logo - 0.4 inch (about 28-30 pixels like your reference)
-                logo = Image(self.logo_path, width=0.4*inch, height=0.4*inch)
-                logo.hAlign = 'CENTER'
-                
-                # Center the logo at the top
-                self.elements.append(logo)
-                self.elements.append(Spacer(1, 0.15*inch))
-            except Exception as e:
-                print(f"Warning: Could not load logo - {e}")
-    
-        # Company info and invoice details
-        left_column_data = [
-            Paragraph(company_info['name'], self.heading_style),
-            Paragraph(company_info['address'], self.small_style),
-            Paragraph(f"{company_info['city']}, {company_info['state']}. {company_info['pincode']}", self.small_style),
-            Paragraph(f"GST NO: {company_info['gstin']}", self.small_style),
-            Paragraph(company_info['email'], self.small_style),
-        ]
+        # Small logo - 0.4 inch (about 28-30 pixels like your reference)
+        if self.template.logo is not None:
+            logo = CachedImage(self.template.logo, width=0.4*inch, height=0.4*inch)
+            logo.hAlign = 'CENTER'
+            
+            # Center the logo at the top
+            self.elements.append(logo)
+            self.elements.append(Spacer(1, 0.15*inch))
+    
+        # Company info and invoice details; the seller column is the same
+        # on every invoice from this seller, so it comes from the section cache
+        seller_lines = (
+            company_info['name'],
+            company_info['address'],
+            f"{company_info['city']}, {company_info['state']}. {company_info['pincode']}",
+            f"GST NO: {company_info['gstin']}",
+            company_info['email'],
+        )
+        left_column_data = [CachedSection(section_cache.get(
+            ('seller', self.template, seller_lines),
+            partial(self._seller_column, self.template, seller_lines)
+        ))]
 
         right_column_data = [
             Paragraph(f'<u>{self._format_date(invoice_date)}</u>', self.normal_style),
@@ -164,37 +489,28 @@ class InvoiceGenerator:
         seller_gstin = f"GST NUMBER: {seller_info['gstin']}"
         buyer_gstin = f"GST NUMBER: {buyer_info.get('gstin', 'N/A')}"
         
-        info_data = [
-            [Paragraph('BILL TO', self.heading_style), Paragraph('SHIP TO', self.heading_style)],
-            [Paragraph(seller_text, self.normal_style), Paragraph(buyer_text, self.normal_style)],
-            [Paragraph(seller_gstin, self.normal_style), Paragraph(buyer_gstin, self.normal_style)],
-        ]
-        
-        info_table = Table(info_data, colWidths=[3.25*inch, 3.25*inch])
-        info_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BOX', (0, 0), (-1, -1), 1, colors.grey),
-            ('LINEBELOW', (0, 0), (-1, 0), 1.5, colors.grey),
-        ]))
-        self.elements.append(info_table)
+        # Repeat seller/buyer pairs reuse the laid out table
+        key = ('parties', self.template, seller_text, buyer_text, seller_gstin, buyer_gstin)
+        self.elements.append(CachedSection(section_cache.get(
+            key, partial(self._party_table, self.template, seller_text, buyer_text, seller_gstin, buyer_gstin)
+        )))
         self.elements.append(Spacer(1, 0.3*inch))
     
-    def add_items(self, items):
-        items_data = [
-            [Paragraph('S.No', self.table_header_style), 
-            Paragraph('Name of Product', self.table_header_style), 
-            Paragraph('HSN/SAC', self.table_header_style),
-            Paragraph('Qty', self.table_header_style), 
-            Paragraph('Rate', self.table_header_style), 
-            Paragraph('Amount', self.table_header_style)]
-        ]
+    def add_items(self, items, high_volume=None, line_amounts=None):
+        # line_amounts come from invoice_totals so rows match the totals exactly
+        if line_amounts is None:
+            line_amounts = [invoice_totals.line_amount(item) for item in items]
+        
+        # Large tables switch to the paged fast path automatically
+        if high_volume is None:
+            high_volume = len(items) >= HIGH_VOLUME_ITEMS
+        if high_volume:
+            self._add_items_high_volume(items, line_amounts)
+            return
         
-        for idx, item in enumerate(items, 1):
-            amount = item['quantity'] * item['rate']
+        items_data = [self._items_header()]
+        
+        for idx, (item, amount) in enumerate(zip(items, line_amounts), 1):
             items_data.append([
                 Paragraph(str(idx), self.normal_style),
                 Paragraph(item['description'], self.normal_style),
@@ -204,9 +520,24 @@ class InvoiceGenerator:
                 Paragraph(f'{amount:.2f}', self.normal_style)
             ])
         
-        items_table = Table(items_data, colWidths=[0.5*inch, 2.8*inch, 0.9*inch, 0.6*inch, 0.9*inch, 1*inch])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#A23034")),
+        items_table = Table(items_data, colWidths=ITEM_COL_WIDTHS)
+        items_table.setStyle(self._items_table_style())
+        self.elements.append(items_table)
+        self.elements.append(Spacer(1, 0.2*inch))
+    
+    def _items_header(self):
+        return [
+            Paragraph('S.No', self.table_header_style), 
+            Paragraph('Name of Product', self.table_header_style), 
+            Paragraph('HSN/SAC', self.table_header_style),
+            Paragraph('Qty', self.table_header_style), 
+            Paragraph('Rate', self.table_header_style), 
+            Paragraph('Amount', self.table_header_style)
+        ]
+    
+    def _items_table_style(self):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), self.template.table_header_color),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('ALIGN', (1, 1), (1, -1), 'LEFT'),
@@ -214,54 +545,101 @@ class InvoiceGenerator:
             ('FONTSIZE', (0, 0), (-1, 0), 10),
             ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
             ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#F9F9F9")),   
+            ('TOPPADDING', (0, 0), (-1, -1), ITEM_CELL_V_PADDING),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), ITEM_CELL_V_PADDING),
+            ('BACKGROUND', (0, 1), (-1, -1), self.template.table_body_color),
             ('GRID', (0, 0), (-1, -1), 1, colors.grey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        self.elements.append(items_table)
-        self.elements.append(Spacer(1, 0.2*inch))
+        ])
+    
+    def _plain_items_table_style(self):
+        # Plain-string body cells set like the normal_style Paragraphs of the standard table
+        style = self._items_table_style()
+        style.add('ALIGN', (0, 1), (-1, -1), 'LEFT')
+        style.add('FONTSIZE', (0, 1), (-1, -1), 10)
+        return style
     
-    def _number_to_words(self, number):
-        ones = ["", "ONE", "TWO", "THREE", "FOUR", "FIVE", "SIX", "SEVEN", "EIGHT", "NINE"]
-        teens = ["TEN", "ELEVEN", "TWELVE", "THIRTEEN", "FOURTEEN", "FIFTEEN", 
-                "SIXTEEN", "SEVENTEEN", "EIGHTEEN", "NINETEEN"]
-        tens = ["", "", "TWENTY", "THIRTY", "FORTY", "FIFTY", "SIXTY", "SEVENTY", "EIGHTY", "NINETY"]
+    def _add_items_high_volume(self, items, line_amounts):
+        """
+        Items table for invoices with thousands of rows. Cells are plain
+        strings unless a description actually needs wrapping, and the
+        table is laid out one page at a time with the header repeated, so
+        cost stays linear in the number of rows (10,000 items render in
+        a few seconds).
+        """
+        rows = []
+        row_heights = []
+        
+        for idx, (item, amount) in enumerate(zip(items, line_amounts), 1):
+            row, row_height = self._plain_item_row(idx, item, amount)
+            rows.append(row)
+            row_heights.append(row_height)
         
-        def convert_below_thousand(num):
-            if num == 0:
-                return ""
-            elif num < 10:
-                return ones[num]
-            elif num < 20:
-                return teens[num - 10]
-            elif num < 100:
-                return tens[num // 10] + ("" if num % 10 == 0 else " " + ones[num % 10])
-            else:
-                return ones[num // 100] + " HUNDRED" + ("" if num % 100 == 0 else " " + convert_below_thousand(num % 100))
+        self.elements.append(PagedItemsTable(
+            self._items_header(), rows, row_heights, ITEM_COL_WIDTHS, self._plain_items_table_style()
+        ))
+        self.elements.append(Spacer(1, 0.2*inch))
+    
+    def _plain_item_row(self, idx, item, amount):
+        """One plain-string items row and its height; only long descriptions become Paragraphs."""
+        description = str(item['description'])
+        description_width = ITEM_COL_WIDTHS[1] - 2 * ITEM_CELL_H_PADDING
         
-        if number == 0:
-            return "ZERO"
+        if stringWidth(description, 'Helvetica', 10) <= description_width:
+            row_height = PLAIN_ROW_HEIGHT
+        else:
+            description = Paragraph(description, self.normal_style)
+            row_height = description.wrap(description_width, PAGE_HEIGHT)[1] + 2 * ITEM_CELL_V_PADDING
         
-        num = int(number)
-        words = ""
-        if num >= 10000000:
-            words += convert_below_thousand(num // 10000000) + " CRORE "
-            num %= 10000000
-        if num >= 100000:
-            words += convert_below_thousand(num // 100000) + " LAKH "
-            num %= 100000
-        if num >= 1000:
-            words += convert_below_thousand(num // 1000) + " THOUSAND "
-            num %= 1000
-        if num > 0:
-            words += convert_below_thousand(num)
-        return words.strip() + " RUPEES ONLY"
+        row = [
+            str(idx),
+            description,
+            str(item.get('hsn_code', '')),
+            f'{int(item["quantity"])}',
+            f'{item["rate"]:.2f}',
+            f'{amount:.2f}'
+        ]
+        return row, row_height
+    
+    def add_streamed_items(self, items, running_totals):
+        """
+        Items table fed from an iterator, for invoices streamed in line by
+        line. Rows are pulled one page at a time and each line amount is
+        added to running_totals as it is read, so only the current page's
+        rows are ever held in memory.
+        """
+        rows = (
+            self._plain_item_row(idx, item, running_totals.add(item))
+            for idx, item in enumerate(items, 1)
+        )
+        self.elements.append(StreamedItemsTable(
+            self._items_header(), rows, ITEM_COL_WIDTHS, self._plain_items_table_style()
+        ))
+        self.elements.append(Spacer(1, 0.2*inch))
+    
+    def add_deferred_totals(self, totals_callback):
+        """Totals section built only once layout reaches it, from totals_callback()."""
+        def build():
+            return self._totals_flowables(**totals_callback().add_totals_kwargs())
+        self.elements.append(DeferredSection(build))
+    
+    @staticmethod
+    def _number_to_words(number):
+        return invoice_totals.number_to_words(number)
     
     def add_totals(self, subtotal, discount_type, discount_value, discount_amount, 
                    cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount, 
                    shipping_amount, total_amount):
+        self.elements.extend(self._totals_flowables(
+            subtotal, discount_type, discount_value, discount_amount,
+            cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount,
+            shipping_amount, total_amount
+        ))
+    
+    def _totals_flowables(self, subtotal, discount_type, discount_value, discount_amount, 
+                          cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount, 
+                          shipping_amount, total_amount):
+        elements = []
         total_in_words = self._number_to_words(total_amount)
         left_column_text = Paragraph(
             f'TOTAL AMOUNT IN WORDS:<br/>{total_in_words}',
@@ -269,48 +647,16 @@ class InvoiceGenerator:
         )
         
         totals_data = [
-            [Paragraph('SUBTOTAL', self.normal_style), Paragraph(f'{subtotal:.2f}', self.normal_style)],
+            [Paragraph(label, self.normal_style), Paragraph(value, self.normal_style)]
+            for label, value in totals_rows(
+                subtotal, discount_type, discount_value, discount_amount,
+                cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount,
+                shipping_amount, total_amount
+            )
         ]
         
-        # Add discount row if applicable
-        if discount_amount > 0:
-            if discount_type == 'percentage':
-                totals_data.append([
-                    Paragraph(f'DISCOUNT ({discount_value}%)', self.normal_style), 
-                    Paragraph(f'-{discount_amount:.2f}', self.normal_style)
-                ])
-            else:
-                totals_data.append([
-                    Paragraph('DISCOUNT', self.normal_style), 
-                    Paragraph(f'-{discount_amount:.2f}', self.normal_style)
-                ])
-            
-            subtotal_after_discount = subtotal - discount_amount
-            totals_data.append([
-                Paragraph('AFTER DISCOUNT', self.normal_style), 
-                Paragraph(f'{subtotal_after_discount:.2f}', self.normal_style)
-            ])
-        
-        # Add tax rows
-        if cgst_rate > 0:
-            totals_data.append([Paragraph(f'CGST ({cgst_rate}%)', self.normal_style), Paragraph(f'{cgst_amount:.2f}', self.normal_style)])
-        
-        if sgst_rate > 0:
-            totals_data.append([Paragraph(f'SGST ({sgst_rate}%)', self.normal_style), Paragraph(f'{sgst_amount:.2f}', self.normal_style)])
-        
-        if igst_rate > 0:
-            totals_data.append([Paragraph(f'IGST ({igst_rate}%)', self.normal_style), Paragraph(f'{igst_amount:.2f}', self.normal_style)])
-        
-        # Add shipping
-        totals_data.append([Paragraph('SHIPPING/HANDLING', self.normal_style), Paragraph(f'{shipping_amount:.2f}', self.normal_style)])
-        
         # Add total
-        grand_total_style = ParagraphStyle(
-            'GrandTotal',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            fontName='Helvetica-Bold'
-        )
+        grand_total_style = self.grand_total_style
         
         totals_data.append([
             Paragraph('TOTAL', grand_total_style), 
@@ -340,11 +686,49 @@ class InvoiceGenerator:
             ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
         ]))
         
-        self.elements.append(main_table)
-        self.elements.append(Spacer(1, 0.4*inch))
+        elements.append(main_table)
+        elements.append(Spacer(1, 0.4*inch))
+        
+        elements.append(CachedSection(section_cache.get(
+            ('notes', self.template, self.template.signatory_text), partial(self._notes_table, self.template)
+        )))
+        elements.append(Spacer(1, 0.2*inch))
+        elements.append(Paragraph("AUTHORIZED SIGNATORY", self.heading_style))
+        return elements
+    
+    # Section builders take only the template: the section cache keeps
+    # them for re-splitting, so they must not hold on to a render
+    @staticmethod
+    def _seller_column(template, lines):
+        return [
+            Paragraph(text, template.heading_style if index == 0 else template.small_style)
+            for index, text in enumerate(lines)
+        ]
+    
+    @staticmethod
+    def _party_table(template, seller_text, buyer_text, seller_gstin, buyer_gstin):
+        info_data = [
+            [Paragraph('BILL TO', template.heading_style), Paragraph('SHIP TO', template.heading_style)],
+            [Paragraph(seller_text, template.normal_style), Paragraph(buyer_text, template.normal_style)],
+            [Paragraph(seller_gstin, template.normal_style), Paragraph(buyer_gstin, template.normal_style)],
+        ]
         
-        left_column_text = Paragraph("THIS IS A COMPUTER GENERATED INVOICE THUS SIGNATURE MAY NOT BE REQUIRED", self.normal_style)
-        right_column_text = Paragraph("FOR FASCINO HEALTH CARE", self.normal_style)
+        info_table = Table(info_data, colWidths=[PARTY_COL_WIDTH, PARTY_COL_WIDTH])
+        info_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), PARTY_CELL_H_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), PARTY_CELL_H_PADDING),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+            ('LINEBELOW', (0, 0), (-1, 0), 1.5, colors.grey),
+        ]))
+        return [info_table]
+    
+    @staticmethod
+    def _notes_table(template):
+        left_column_text = Paragraph("THIS IS A COMPUTER GENERATED INVOICE THUS SIGNATURE MAY NOT BE REQUIRED", template.normal_style)
+        right_column_text = Paragraph(template.signatory_text, template.normal_style)
         notes_table = Table(
             [[left_column_text, right_column_text]],
             colWidths=[3.25*inch, 3.25*inch]
@@ -354,18 +738,37 @@ class InvoiceGenerator:
             ('ALIGN', (0, 0), (0, 0), 'LEFT'),
             ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
         ]))
-        self.elements.append(notes_table)
-        self.elements.append(Spacer(1, 0.2*inch))
-        self.elements.append(Paragraph("AUTHORIZED SIGNATORY", self.heading_style))
+        return [notes_table]
+    
+    def start_new_invoice(self):
+        """Begin another invoice in the same document, on a fresh page."""
+        if self.elements:
+            self.elements.append(PageBreak())
     
     def generate(self):
         self.doc.build(self.elements, onFirstPage=self._add_header_and_footer, 
                        onLaterPages=self._add_header_and_footer)
         return self.output_filename
     
+    @property
+    def page_count(self):
+        return self.doc.page
+    
+    def get_pdf_bytes(self):
+        if isinstance(self.output_filename, (str, os.PathLike)):
+            with open(self.output_filename, 'rb') as pdf_file:
+                return pdf_file.read()
+        return self.output_filename.getvalue()
+    
     def _add_header_and_footer(self, canvas_obj, doc):
-        self._add_header(canvas_obj, doc)
-        self._add_footer(canvas_obj, doc)
+        # The bars and footer line are identical on every page, so they are
+        # drawn once into a form XObject that each page references
+        if not canvas_obj._doc.hasForm(PAGE_FURNITURE_FORM):
+            canvas_obj.beginForm(PAGE_FURNITURE_FORM)
+            self._add_header(canvas_obj, doc)
+            self._add_footer(canvas_obj, doc)
+            canvas_obj.endForm()
+        canvas_obj.doForm(PAGE_FURNITURE_FORM)
     
     @staticmethod
     def _format_date(date_str):
@@ -377,12 +780,181 @@ class InvoiceGenerator:
     
     @staticmethod
     def calculate_tax(subtotal, seller_state, buyer_state, cgst_rate=9, sgst_rate=9, igst_rate=18):
-        is_same_state = seller_state.strip().lower() == buyer_state.strip().lower()
-        
-        if is_same_state:
-            cgst_amt = subtotal * (cgst_rate / 100)
-            sgst_amt = subtotal * (sgst_rate / 100)
-            return cgst_rate, cgst_amt, sgst_rate, sgst_amt, 0, 0
-        else:
-            igst_amt = subtotal * (igst_rate / 100)
-            return 0, 0, 0, 0, igst_rate, igst_amt
+        return invoice_totals.calculate_tax(
+            subtotal, seller_state, buyer_state,
+            cgst_rate=cgst_rate, sgst_rate=sgst_rate, igst_rate=igst_rate
+        )
+
+
+def render_invoice(data, output_filename=None, logo_path=None, generated_on=None, reproducible=False,
+                   totals=None, timer=NULL_TIMER, engine='auto'):
+    """
+    Build a complete invoice from an /api/generate-invoice payload.
+    Returns the renderer after the PDF has been generated.
+    Stage durations (totals, layout, build) are recorded on timer.
+    
+    engine='auto' draws standard one-page invoices straight onto the
+    canvas and falls back to platypus for anything else; 'platypus'
+    always uses InvoiceGenerator.
+    """
+    # Every amount is computed once, with exact decimals
+    if totals is None:
+        with timer.stage('totals'):
+            totals = invoice_totals.compute_totals(data)
+    
+    with timer.stage('layout'):
+        invoice = None
+        if engine == 'auto':
+            invoice = _layout_canvas(data, totals, output_filename, logo_path, generated_on, reproducible)
+        if invoice is None:
+            invoice = _layout_invoice(data, totals, output_filename, logo_path, generated_on, reproducible)
+    
+    with timer.stage('build'):
+        invoice.generate()
+    return invoice
+
+
+def _layout_canvas(data, totals, output_filename, logo_path, generated_on, reproducible):
+    # Imported here: canvas_renderer builds on this module
+    from canvas_renderer import CanvasInvoiceRenderer
+    
+    template = registry.get(tenant_key(data['company_info']), logo_path=logo_path)
+    invoice = CanvasInvoiceRenderer(
+        template=template,
+        output_filename=output_filename,
+        generated_on=generated_on,
+        reproducible=reproducible
+    )
+    return invoice if invoice.plan(data, totals) else None
+
+
+def _layout_invoice(data, totals, output_filename, logo_path, generated_on, reproducible):
+    template = registry.get(tenant_key(data['company_info']), logo_path=logo_path)
+    invoice = InvoiceGenerator(
+        output_filename=output_filename,
+        logo_path=logo_path,
+        template=template,
+        generated_on=generated_on,
+        reproducible=reproducible
+    )
+    _add_invoice_sections(invoice, data, totals)
+    return invoice
+
+
+def _add_invoice_sections(invoice, data, totals):
+    # Add logo and invoice details
+    invoice.add_logo_and_invoice_details(
+        company_info=data['company_info'],
+        invoice_number=data['invoice_number'],
+        invoice_date=data['invoice_date'],
+        po_number=data.get('po_number'),
+        agreement=data.get('agreement')
+    )
+    
+    # Add party details
+    invoice.add_party_details(
+        seller_info=data['company_info'],
+        buyer_info=data['buyer_info']
+    )
+    
+    # Add items
+    invoice.add_items(data['items'], line_amounts=totals.line_amounts)
+    
+    # Add totals with discount support
+    invoice.add_totals(**totals.add_totals_kwargs())
+
+
+def render_invoice_stream(header, items, output_filename=None, logo_path=None, generated_on=None,
+                          reproducible=False, timer=NULL_TIMER):
+    """
+    Build an invoice whose line items arrive as an iterator. header is an
+    /api/generate-invoice payload without 'items'. Items are consumed page
+    by page during the build and totalled as they go; the totals section
+    is laid out from those running totals once the last item is read.
+    Returns (InvoiceGenerator, RunningTotals); the latter's totals and
+    item_count are final once the PDF is generated.
+    """
+    running = invoice_totals.RunningTotals()
+
+    def finish():
+        if running.item_count == 0:
+            raise ValueError('Invoice has no items')
+        return running.finish(header)
+
+    with timer.stage('layout'):
+        template = registry.get(tenant_key(header['company_info']), logo_path=logo_path)
+        invoice = InvoiceGenerator(
+            output_filename=output_filename,
+            logo_path=logo_path,
+            template=template,
+            generated_on=generated_on,
+            reproducible=reproducible
+        )
+        invoice.add_logo_and_invoice_details(
+            company_info=header['company_info'],
+            invoice_number=header['invoice_number'],
+            invoice_date=header['invoice_date'],
+            po_number=header.get('po_number'),
+            agreement=header.get('agreement')
+        )
+        invoice.add_party_details(seller_info=header['company_info'], buyer_info=header['buyer_info'])
+        invoice.add_streamed_items(items, running)
+        invoice.add_deferred_totals(finish)
+
+    # Items are read, laid out and totalled inside the build
+    with timer.stage('build'):
+        invoice.generate()
+    return invoice, running
+
+
+def render_statement(invoices, output_filename=None, logo_path=None, generated_on=None,
+                     reproducible=False, timer=NULL_TIMER):
+    """
+    Render several invoices into one PDF, each starting on a new page.
+    Everything shared (logo image, fonts, page furniture) is embedded
+    once and referenced from every page. All invoices must come from the
+    same seller, whose template every page uses; otherwise ValueError.
+    Returns the InvoiceGenerator after generation.
+    """
+    seller = tenant_key(invoices[0]['company_info'])
+    if any(tenant_key(data['company_info']) != seller for data in invoices[1:]):
+        raise ValueError('All invoices in a statement must be from the same seller')
+    template = registry.get(seller, logo_path=logo_path)
+    statement = InvoiceGenerator(
+        output_filename=output_filename,
+        logo_path=logo_path,
+        template=template,
+        generated_on=generated_on,
+        reproducible=reproducible
+    )
+    
+    for data in invoices:
+        with timer.stage('totals'):
+            totals = invoice_totals.compute_totals(data)
+        with timer.stage('layout'):
+            statement.start_new_invoice()
+            _add_invoice_sections(statement, data, totals)
+    
+    with timer.stage('build'):
+        statement.generate()
+    return statement
+
+
+def invoice_filename(invoice_number):
+    # Create safe filename without spaces
+    safe_invoice_number = str(invoice_number).replace(' ', '_').replace('/', '_')
+    return f'Invoice_{safe_invoice_number}.pdf'
+
+
+def render_invoice_job(index, data, logo_path=None):
+    """
+    Process-pool entry point: render one payload and report the outcome
+    as plain picklable values instead of raising.
+    Returns (index, filename, pdf_bytes, error).
+    """
+    try:
+        filename = invoice_filename(data['invoice_number'])
+        invoice = render_invoice(data, logo_path=logo_path)
+        return index, filename, invoice.get_pdf_bytes(), None
+    except Exception as e:
+        return index, None, None, f'{type(e).__name__}: {e}'
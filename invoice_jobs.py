@@ -0,0 +1,222 @@
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT,
+    error TEXT,
+    filename TEXT,
+    pdf BLOB,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    claimed_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at);
+"""
+
+COLUMNS = 'id, status, error, filename, created_at, started_at, finished_at'
+
+
+class QueueFull(Exception):
+    pass
+
+
+class InvoiceJob:
+    """A job as last stored; pdf_bytes is only loaded for downloads."""
+
+    def __init__(self, id, status, error=None, filename=None, created_at=None,
+                 started_at=None, finished_at=None, pdf_bytes=None):
+        self.id = id
+        self.status = status
+        self.error = error
+        self.filename = filename
+        self.created_at = created_at
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.pdf_bytes = pdf_bytes
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'filename': self.filename,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class InvoiceJobQueue:
+    """
+    Background invoice rendering with job state in a SQLite file, so every
+    server process sees every job: a job submitted to one gunicorn worker
+    can be polled and downloaded through any other. Each process runs a
+    fixed number of worker threads that claim queued jobs from the file
+    and call render(data) -> (filename, pdf_bytes). At most max_queued
+    jobs wait at a time. Finished jobs, including their PDFs, are dropped
+    ttl_seconds after they complete. A job left running for
+    stale_seconds (its process died mid-render) is queued again.
+
+    The file is only created on the first submit, get or start(), so
+    processes that never use jobs leave nothing on disk.
+    """
+
+    def __init__(self, render, path, workers=2, max_queued=100, ttl_seconds=3600,
+                 stale_seconds=600, poll_interval=0.5):
+        self.render = render
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _create_schema(self):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.executescript(SCHEMA)
+            finally:
+                connection.close()
+            self._schema_ready = True
+
+    def _connection(self):
+        if not self._schema_ready:
+            self._create_schema()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def start(self):
+        """Start this process's worker threads (once per process)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f'invoice-job-{index}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, data):
+        self.start()
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        created_at = datetime.now().isoformat()
+        # One statement, so concurrent submits from several processes cannot overfill the queue
+        cursor = self._connection().execute(
+            'INSERT INTO jobs (id, status, payload, created_at)'
+            ' SELECT ?, ?, ?, ? WHERE (SELECT COUNT(*) FROM jobs WHERE status = ?) < ?',
+            (job_id, QUEUED, json.dumps(data), created_at, QUEUED, self.max_queued)
+        )
+        if cursor.rowcount == 0:
+            raise QueueFull('Invoice job queue is full, try again later')
+        self._wakeup.set()
+        return InvoiceJob(job_id, QUEUED, created_at=created_at)
+
+    def get(self, job_id, with_pdf=False):
+        self.start()
+        self._purge_expired()
+        columns = f'{COLUMNS}, pdf' if with_pdf else COLUMNS
+        row = self._connection().execute(f'SELECT {columns} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = InvoiceJob(*(row[name] for name in COLUMNS.split(', ')))
+        if with_pdf and row['pdf'] is not None:
+            job.pdf_bytes = bytes(row['pdf'])
+        return job
+
+    def _claim(self):
+        row = self._connection().execute(
+            'UPDATE jobs SET status = ?, started_at = ?, claimed_at = ?'
+            ' WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY rowid LIMIT 1)'
+            ' RETURNING id, payload',
+            (RUNNING, datetime.now().isoformat(), time.time(), QUEUED)
+        ).fetchone()
+        return (row['id'], json.loads(row['payload'])) if row else (None, None)
+
+    def _finish(self, job_id, status, filename=None, pdf_bytes=None, error=None):
+        # The payload is no longer needed once rendered
+        self._connection().execute(
+            'UPDATE jobs SET status = ?, filename = ?, pdf = ?, error = ?, payload = NULL,'
+            ' finished_at = ?, expires_at = ? WHERE id = ?',
+            (status, filename, pdf_bytes, error, datetime.now().isoformat(),
+             time.time() + self.ttl_seconds, job_id)
+        )
+
+    def _worker(self):
+        while True:
+            try:
+                job_id, data = self._claim()
+            except sqlite3.Error as e:
+                print(f'Warning: could not claim invoice job - {e}')
+                job_id = None
+            if job_id is None:
+                # Jobs submitted to other processes are picked up on the next poll
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                self._purge_expired()
+                continue
+            try:
+                filename, pdf_bytes = self.render(data)
+                self._finish(job_id, DONE, filename=filename, pdf_bytes=pdf_bytes)
+            except Exception as e:
+                self._finish(job_id, FAILED, error=str(e))
+
+    def _purge_expired(self):
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute('DELETE FROM jobs WHERE expires_at <= ?', (now,))
+            connection.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL, claimed_at = NULL'
+                ' WHERE status = ? AND claimed_at <= ?',
+                (QUEUED, RUNNING, now - self.stale_seconds)
+            )
+        except sqlite3.Error as e:
+            print(f'Warning: could not purge invoice jobs - {e}')
+
+    def stats(self):
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        if not self._schema_ready and not os.path.exists(self.path):
+            return counts
+        rows = self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        for status, count in rows:
+            counts[status] = count
+        return counts
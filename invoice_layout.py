@@ -0,0 +1,35 @@
+"""
+Page and table geometry shared by InvoiceGenerator and the ReportLab-free
+page estimate in invoice_preview, so the two cannot drift apart. All
+lengths are in points.
+"""
+
+INCH = 72.0
+
+# A4, defined as ReportLab does (29.7cm)
+PAGE_HEIGHT = 29.7 * INCH / 2.54
+
+# SimpleDocTemplate margins; its frame adds FRAME_PADDING on every side
+TOP_MARGIN = 70
+BOTTOM_MARGIN = 50
+SIDE_MARGIN = 40
+FRAME_PADDING = 6
+
+ITEM_COL_WIDTHS = [0.5*INCH, 2.8*INCH, 0.9*INCH, 0.6*INCH, 0.9*INCH, 1*INCH]
+
+# Item cells: 6pt left and right padding (Table's default), 8pt top and bottom
+ITEM_CELL_H_PADDING = 6
+ITEM_CELL_V_PADDING = 8
+
+# Item count from which add_items uses the paged plain-string table
+HIGH_VOLUME_ITEMS = 100
+
+# Bold 10pt header cell plus 8pt top and bottom padding
+HEADER_ROW_HEIGHT = 10 * 1.2 + 2 * ITEM_CELL_V_PADDING
+
+# 10pt single-line body cell plus 8pt top and bottom padding
+PLAIN_ROW_HEIGHT = 10 * 1.2 + 2 * ITEM_CELL_V_PADDING
+
+# BILL TO/SHIP TO columns and their left and right padding
+PARTY_COL_WIDTH = 3.25 * INCH
+PARTY_CELL_H_PADDING = 12
@@ -0,0 +1,158 @@
+"""
+Totals and layout preview for an invoice payload, without ReportLab.
+
+preview() returns everything the web form shows while the user types
+(line amounts, discount, GST split, grand total, amount in words) plus an
+estimate of how many pages the PDF will have. The estimate replays the
+InvoiceGenerator layout with fixed section heights and an average
+Helvetica glyph width instead of real font metrics, so it is usually
+exact and otherwise off by at most a page for text-heavy invoices.
+"""
+import math
+
+from invoice_layout import (
+    PAGE_HEIGHT, TOP_MARGIN, BOTTOM_MARGIN, FRAME_PADDING, ITEM_COL_WIDTHS, ITEM_CELL_H_PADDING,
+    ITEM_CELL_V_PADDING, HIGH_VOLUME_ITEMS, HEADER_ROW_HEIGHT, PARTY_COL_WIDTH, PARTY_CELL_H_PADDING
+)
+from invoice_totals import compute_totals, is_same_state, number_to_words
+
+
+# Usable frame height on every page
+FRAME_HEIGHT = PAGE_HEIGHT - TOP_MARGIN - BOTTOM_MARGIN - 2 * FRAME_PADDING
+
+# Measured from InvoiceGenerator output: everything above the items table,
+# details block plus BILL TO/SHIP TO
+HEADER_BLOCK_HEIGHT = 222.6
+LOGO_BLOCK_HEIGHT = 0.4 * 72 + 0.15 * 72
+# Each of PO NUMBER/AGREEMENT beyond the first grows the right column
+EXTRA_DETAIL_HEIGHT = 37.8
+DETAIL_COLUMN_SLACK = 37.8 - 29.4
+
+# Totals table, notes and signatory below the items table
+TAIL_BASE_HEIGHT = 147.6
+TOTALS_ROW_HEIGHT = 24
+# The grand total wraps in its 1 inch column from 10 lakh upwards
+TOTAL_VALUE_WIDTH = 1 * 72 - 12
+
+ITEM_LINE_HEIGHT = 12
+ITEM_CELL_PADDING = 2 * ITEM_CELL_V_PADDING
+DESCRIPTION_WIDTH = ITEM_COL_WIDTHS[1] - 2 * ITEM_CELL_H_PADDING
+PARTY_WIDTH = PARTY_COL_WIDTH - 2 * PARTY_CELL_H_PADDING
+
+# Helvetica advance widths for ' ' to '~' in 1/1000 em, from the standard AFM
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+# Used for anything outside printable ASCII
+DEFAULT_GLYPH_WIDTH = 556
+
+
+def text_width(text, font_size):
+    total = 0
+    for char in text:
+        code = ord(char) - 32
+        total += HELVETICA_WIDTHS[code] if 0 <= code < len(HELVETICA_WIDTHS) else DEFAULT_GLYPH_WIDTH
+    return total * font_size / 1000
+
+
+def text_lines(text, font_size, width):
+    """Wrapped line count for text set in Helvetica, breaking at spaces like Paragraph."""
+    words = str(text).split()
+    if not words:
+        return 1
+    space = text_width(' ', font_size)
+    lines, used = 1, 0.0
+    for word in words:
+        word_width = text_width(word, font_size)
+        if used and used + space + word_width > width:
+            lines += 1
+            used = word_width
+        else:
+            used += (space if used else 0) + word_width
+        # Words longer than the column are split across lines
+        if used > width:
+            extra = math.ceil(used / width) - 1
+            lines += extra
+            used -= extra * width
+    return lines
+
+
+def _party_text(info):
+    return f"{info.get('name', '')} {info.get('address', '')} {info.get('city', '')}, " \
+           f"{info.get('state', '')} - {info.get('pincode', '')}"
+
+
+def _header_height(data, has_logo):
+    height = HEADER_BLOCK_HEIGHT + (LOGO_BLOCK_HEIGHT if has_logo else 0)
+    extras = sum(1 for field in ('po_number', 'agreement') if data.get(field))
+    if extras > 1:
+        height += extras * EXTRA_DETAIL_HEIGHT - DETAIL_COLUMN_SLACK - EXTRA_DETAIL_HEIGHT
+    # The party table grows with the longer of the two addresses
+    party_lines = max(
+        text_lines(_party_text(data['company_info']), 10, PARTY_WIDTH),
+        text_lines(_party_text(data['buyer_info']), 10, PARTY_WIDTH),
+    )
+    return height + (party_lines - 1) * ITEM_LINE_HEIGHT
+
+
+def _row_heights(items):
+    # Paragraph and plain string cells are both 10pt with a 12pt leading
+    for item in items:
+        lines = text_lines(item.get('description', ''), 10, DESCRIPTION_WIDTH)
+        yield lines * ITEM_LINE_HEIGHT + ITEM_CELL_PADDING
+
+
+def _totals_row_count(totals):
+    # Same rows as invoice_generator.totals_rows: subtotal, discount pair, taxes, shipping
+    rows = 2
+    if totals.discount_amount > 0:
+        rows += 2
+    return rows + sum(1 for rate in (totals.cgst_rate, totals.sgst_rate, totals.igst_rate) if rate > 0)
+
+
+def estimate_pages(data, totals=None, has_logo=False):
+    """Pages InvoiceGenerator will produce for data, from section heights alone."""
+    if totals is None:
+        totals = compute_totals(data)
+
+    # Only the high volume table repeats its header row after a page break
+    high_volume = len(data['items']) >= HIGH_VOLUME_ITEMS
+    repeated_header = HEADER_ROW_HEIGHT if high_volume else 0
+
+    pages = 1
+    available = FRAME_HEIGHT - _header_height(data, has_logo)
+    used = HEADER_ROW_HEIGHT
+    for row_height in _row_heights(data['items']):
+        if used + row_height > available:
+            pages += 1
+            available = FRAME_HEIGHT
+            used = repeated_header
+        used += row_height
+
+    tail = TAIL_BASE_HEIGHT + TOTALS_ROW_HEIGHT * _totals_row_count(totals)
+    # Digits and '.' are the same width in Helvetica-Bold
+    total_lines = text_lines(f'{totals.total_amount:.2f}', 12, TOTAL_VALUE_WIDTH)
+    tail += (total_lines - 1) * ITEM_LINE_HEIGHT
+    if used + tail > available:
+        pages += 1
+    return pages
+
+
+def preview(data, has_logo=False):
+    """JSON friendly totals, tax split, amount in words and page estimate."""
+    totals = compute_totals(data)
+    intra_state = is_same_state(data['company_info']['state'], data['buyer_info']['state'])
+    result = totals.to_dict()
+    result.update({
+        'tax_type': 'CGST+SGST' if intra_state else 'IGST',
+        'total_tax': str(totals.cgst_amount + totals.sgst_amount + totals.igst_amount),
+        'amount_in_words': number_to_words(totals.total_amount),
+        'item_count': len(data['items']),
+        'estimated_pages': estimate_pages(data, totals, has_logo=has_logo),
+    })
+    return result
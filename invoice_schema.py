@@ -0,0 +1,313 @@
+"""
+Validation and normalisation of invoice payloads before anything renders.
+
+The schema is declared once as nested field checks and compiled into
+closures when an InvoiceSchema is built (app.py builds one at startup),
+so validating a request is a single pass over the payload with no
+per-request setup. Every problem is collected rather than stopping at
+the first, and reported per field:
+
+    {"field": "items[3].rate", "message": "must be at least 0"}
+
+A valid payload comes back normalised: only the fields the renderer
+uses, strings stripped, GSTINs upper-cased, numeric strings converted
+to numbers, dates in YYYY-MM-DD and optional fields filled with their
+defaults, so rendering can index it without further checks.
+"""
+from datetime import datetime
+import math
+import re
+
+
+MISSING = object()
+
+DEFAULT_MAX_ITEMS = 10000
+
+# 2 digit state code, PAN (5 letters, 4 digits, 1 letter), entity number, 'Z', check character
+GSTIN_PATTERN = r'[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]'
+PINCODE_PATTERN = r'[0-9]{6}'
+HSN_PATTERN = r'[0-9]{4,8}'
+EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+
+# Accepted invoice_date formats; the first is what the renderer expects
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y')
+
+MAX_AMOUNT = 10 ** 12
+
+
+class ValidationError(ValueError):
+    """Raised with the full list of {"field", "message"} problems in a payload."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        summary = '; '.join(f"{error['field']}: {error['message']}" for error in errors[:3])
+        if len(errors) > 3:
+            summary += f' (and {len(errors) - 3} more)'
+        super().__init__(f'Invalid invoice: {summary}')
+
+
+def _field_path(path, name):
+    return f'{path}.{name}' if path else name
+
+
+def string(required=True, default='', max_length=200, pattern=None, message=None, upper=False):
+    regex = re.compile(pattern) if pattern else None
+
+    def check(value, path, errors):
+        if value is MISSING or value is None or value == '':
+            if required:
+                errors.append({'field': path, 'message': 'is required'})
+            return default
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            errors.append({'field': path, 'message': 'must be a string'})
+            return default
+        value = str(value).strip()
+        if upper:
+            value = value.upper()
+        if not value:
+            if required:
+                errors.append({'field': path, 'message': 'is required'})
+            return default
+        if len(value) > max_length:
+            errors.append({'field': path, 'message': f'must be at most {max_length} characters'})
+        elif regex is not None and not regex.fullmatch(value):
+            errors.append({'field': path, 'message': message or f'must match {pattern}'})
+        return value
+
+    return check
+
+
+def _parse_number(value):
+    """int or float for a JSON number or numeric string, else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            value = int(text)
+        except ValueError:
+            try:
+                value = float(text)
+            except ValueError:
+                return None
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value if isinstance(value, (int, float)) else None
+
+
+def number(required=True, default=None, minimum=None, maximum=None, exclusive_minimum=False):
+    def check(value, path, errors):
+        if value is MISSING or value is None or value == '':
+            if required:
+                errors.append({'field': path, 'message': 'is required'})
+            return default
+        parsed = _parse_number(value)
+        if parsed is None:
+            errors.append({'field': path, 'message': 'must be a number'})
+            return default
+        if minimum is not None:
+            if exclusive_minimum and parsed <= minimum:
+                errors.append({'field': path, 'message': f'must be greater than {minimum}'})
+            elif parsed < minimum:
+                errors.append({'field': path, 'message': f'must be at least {minimum}'})
+        if maximum is not None and parsed > maximum:
+            errors.append({'field': path, 'message': f'must be at most {maximum}'})
+        return parsed
+
+    return check
+
+
+def choice(values, default):
+    def check(value, path, errors):
+        if value is MISSING or value is None or value == '':
+            return default
+        if value not in values:
+            errors.append({'field': path, 'message': f'must be one of {", ".join(values)}'})
+            return default
+        return value
+
+    return check
+
+
+def date(formats=DATE_FORMATS):
+    def check(value, path, errors):
+        if value is MISSING or value is None or value == '':
+            errors.append({'field': path, 'message': 'is required'})
+            return None
+        if isinstance(value, str):
+            for date_format in formats:
+                try:
+                    return datetime.strptime(value.strip(), date_format).strftime(formats[0])
+                except ValueError:
+                    continue
+        errors.append({'field': path, 'message': 'must be a date as YYYY-MM-DD'})
+        return value
+
+    return check
+
+
+def obj(fields, rules=()):
+    """
+    Object with the given field checks; keys not in fields are dropped,
+    as are optional fields whose default is MISSING and that were not
+    given. rules(normalized, path, errors) run afterwards for checks that
+    span several fields.
+    """
+    fields = tuple(fields.items())
+
+    def check(value, path, errors):
+        if value is MISSING or value is None:
+            errors.append({'field': path or 'payload', 'message': 'is required'})
+            return None
+        if not isinstance(value, dict):
+            errors.append({'field': path or 'payload', 'message': 'must be an object'})
+            return None
+        normalized = {}
+        for name, field_check in fields:
+            checked = field_check(value.get(name, MISSING), _field_path(path, name), errors)
+            if checked is not MISSING:
+                normalized[name] = checked
+        for rule in rules:
+            rule(normalized, path, errors)
+        return normalized
+
+    return check
+
+
+def array(item_check, min_items=1, max_items=None):
+    def check(value, path, errors):
+        if value is MISSING or value is None:
+            errors.append({'field': path, 'message': 'is required'})
+            return []
+        if not isinstance(value, list):
+            errors.append({'field': path, 'message': 'must be a list'})
+            return []
+        if len(value) < min_items:
+            errors.append({'field': path, 'message': f'must have at least {min_items} item(s)'})
+        if max_items is not None and len(value) > max_items:
+            errors.append({'field': path, 'message': f'must have at most {max_items} items'})
+            return []
+        return [item_check(item, f'{path}[{index}]', errors) for index, item in enumerate(value)]
+
+    return check
+
+
+def _party_fields(gstin_default=''):
+    return {
+        'name': string(),
+        'address': string(max_length=500),
+        'city': string(),
+        'state': string(),
+        'pincode': string(pattern=PINCODE_PATTERN, message='must be a 6 digit PIN code'),
+        # Optional because unregistered sellers and buyers have none
+        'gstin': string(required=False, default=gstin_default, upper=True, pattern=GSTIN_PATTERN,
+                        message='must be a valid 15 character GSTIN'),
+    }
+
+
+def _header_fields():
+    return {
+        'invoice_number': string(max_length=64),
+        'invoice_date': date(),
+        'po_number': string(required=False, default=None, max_length=64),
+        'agreement': string(required=False, default=None, max_length=64),
+        'company_info': obj({
+            **_party_fields(),
+            'email': string(required=False, pattern=EMAIL_PATTERN, message='must be an email address'),
+        }),
+        # Left out when not given, so the invoice prints "GST NUMBER: N/A"
+        'buyer_info': obj(_party_fields(gstin_default=MISSING)),
+        **_charge_fields(),
+    }
+
+
+def _charge_fields():
+    return {
+        'discount_type': choice(('none', 'percentage', 'amount'), default='none'),
+        'discount_value': number(required=False, default=0, minimum=0, maximum=MAX_AMOUNT),
+        'shipping_charges': number(required=False, default=0, minimum=0, maximum=MAX_AMOUNT),
+        'cgst_rate': number(required=False, default=9, minimum=0, maximum=100),
+        'sgst_rate': number(required=False, default=9, minimum=0, maximum=100),
+        'igst_rate': number(required=False, default=18, minimum=0, maximum=100),
+    }
+
+
+def _draft_fields():
+    """Only what totals and the page estimate read, with nothing required."""
+    party = {
+        name: string(required=False, max_length=500)
+        for name in ('name', 'address', 'city', 'state', 'pincode')
+    }
+    return {
+        'po_number': string(required=False, default=None, max_length=64),
+        'agreement': string(required=False, default=None, max_length=64),
+        'company_info': obj(party),
+        'buyer_info': obj(party),
+        **_charge_fields(),
+    }
+
+
+def _item_fields():
+    return {
+        'description': string(max_length=1000),
+        'hsn_code': string(required=False, pattern=HSN_PATTERN, message='must be a 4 to 8 digit HSN/SAC code'),
+        'quantity': number(minimum=0, exclusive_minimum=True, maximum=MAX_AMOUNT),
+        'rate': number(minimum=0, maximum=MAX_AMOUNT),
+    }
+
+
+def _draft_item_fields():
+    return {
+        'description': string(required=False, max_length=1000),
+        'quantity': number(required=False, default=0, minimum=0, maximum=MAX_AMOUNT),
+        'rate': number(required=False, default=0, minimum=0, maximum=MAX_AMOUNT),
+    }
+
+
+def _check_discount(data, path, errors):
+    if data['discount_type'] == 'percentage' and data['discount_value'] > 100:
+        errors.append({'field': _field_path(path, 'discount_value'),
+                       'message': 'must be at most 100 for a percentage discount'})
+
+
+class InvoiceSchema:
+    """
+    Compiled invoice schema. validate() checks a whole payload;
+    validate_header() and validate_item() check the two halves of a
+    streamed upload separately. validate_draft() accepts a half filled
+    form, checking only the amounts, for previews while the user types.
+    """
+
+    def __init__(self, max_items=DEFAULT_MAX_ITEMS):
+        self.max_items = max_items
+        self._item = obj(_item_fields())
+        self._header = obj(_header_fields(), rules=(_check_discount,))
+        self._invoice = obj(
+            {**_header_fields(), 'items': array(self._item, 1, max_items)},
+            rules=(_check_discount,)
+        )
+        self._draft = obj(
+            {**_draft_fields(), 'items': array(obj(_draft_item_fields()), 1, max_items)},
+            rules=(_check_discount,)
+        )
+
+    @staticmethod
+    def _run(check, value, path=''):
+        errors = []
+        normalized = check(value, path, errors)
+        if errors:
+            raise ValidationError(errors)
+        return normalized
+
+    def validate(self, data, path=''):
+        """Normalised copy of an /api/generate-invoice payload, or ValidationError."""
+        return self._run(self._invoice, data, path)
+
+    def validate_draft(self, data):
+        return self._run(self._draft, data)
+
+    def validate_header(self, header):
+        return self._run(self._header, header)
+
+    def validate_item(self, item, index):
+        return self._run(self._item, item, f'items[{index}]')
@@ -0,0 +1,141 @@
+"""
+Incremental parsing of streamed invoice uploads.
+
+The body starts with one line holding the invoice header (an
+/api/generate-invoice payload without "items"), followed by the line
+items either as NDJSON (one item object per line) or as a single JSON
+array that may span any number of chunks:
+
+    {"invoice_number": "INV/1", "company_info": {...}, "buyer_info": {...}}
+    {"description": "Gloves", "quantity": 2, "rate": 150}
+    {"description": "Masks", "quantity": 10, "rate": 12.5}
+
+Items are decoded one at a time as bytes arrive, so only the current
+chunk and the current item are ever held in memory.
+"""
+import codecs
+import json
+import re
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Longest single header or item accepted, so a missing newline cannot buffer the whole body
+MAX_RECORD_BYTES = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_NON_WHITESPACE = re.compile(r'\S')
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+class InvoiceStream:
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._decode = codecs.getincrementaldecoder('utf-8')().decode
+        # Unconsumed text is self._buffer[self._pos:]
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read another chunk into the buffer; False at end of body."""
+        if self._eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        rest = self._buffer[self._pos:]
+        if not chunk:
+            self._eof = True
+            self._buffer, self._pos = rest + self._decode(b'', final=True), 0
+            return False
+        if len(rest) > MAX_RECORD_BYTES:
+            raise StreamFormatError('Record too large')
+        self._buffer, self._pos = rest + self._decode(chunk), 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character without consuming it, or '' at end of body."""
+        while True:
+            match = _NON_WHITESPACE.search(self._buffer, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buffer[self._pos]
+            self._pos = len(self._buffer)
+            if not self._fill():
+                return ''
+
+    def _read_line(self):
+        while True:
+            end = self._buffer.find('\n', self._pos)
+            if end != -1:
+                line = self._buffer[self._pos:end]
+                self._pos = end + 1
+                return line
+            if not self._fill():
+                line = self._buffer[self._pos:]
+                self._pos = len(self._buffer)
+                return line
+
+    def _read_value(self):
+        """Decode one JSON value at the current position, reading more until it is complete."""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise StreamFormatError(f'Invalid JSON: {e.msg}') from None
+            self._pos = end
+            return value
+
+    def read_header(self):
+        if not self._peek():
+            raise StreamFormatError('Empty request body')
+        try:
+            header = json.loads(self._read_line())
+        except json.JSONDecodeError as e:
+            raise StreamFormatError(f'Invalid header line: {e.msg}') from None
+        if not isinstance(header, dict):
+            raise StreamFormatError('Header line must be an object')
+        if 'items' in header:
+            raise StreamFormatError('Send items after the header line, not inside it')
+        return header
+
+    def items(self):
+        """Yield item dicts as they arrive, NDJSON or a JSON array."""
+        first = self._peek()
+        if not first:
+            return
+        # Only the framing is checked here; item contents are the schema's job
+        yield from self._array_items() if first == '[' else self._ndjson_items()
+
+    def _ndjson_items(self):
+        while self._peek():
+            try:
+                yield json.loads(self._read_line())
+            except json.JSONDecodeError as e:
+                raise StreamFormatError(f'Invalid item line: {e.msg}') from None
+
+    def _array_items(self):
+        self._pos += 1
+        expect_item = True
+        while True:
+            char = self._peek()
+            if not char:
+                raise StreamFormatError('Unterminated items array')
+            if char == ']':
+                self._pos += 1
+                break
+            if not expect_item:
+                if char != ',':
+                    raise StreamFormatError('Expected , between items')
+                self._pos += 1
+                expect_item = True
+                continue
+            yield self._read_value()
+            expect_item = False
+        if self._peek():
+            raise StreamFormatError('Unexpected data after items array')
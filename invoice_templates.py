@@ -0,0 +1,200 @@
+from collections import OrderedDict
+import os
+import threading
+
+
+DEFAULT_TENANT = '__default__'
+
+DEFAULT_TEMPLATE_CONFIG = {
+    'logo_path': None,
+    'header_color': '#B02415',
+    'table_header_color': '#A23034',
+    'table_body_color': '#F9F9F9',
+    'heading_color': '#34495E',
+    'label_color': '#2C3E50',
+    'footer_color': '#666666',
+    'footer_text': '© 2025 Fascino. All rights reserved. | Invoice Generated on {date}',
+    'signatory_text': 'FOR FASCINO HEALTH CARE',
+}
+
+
+class InvoiceTemplate:
+    """
+    Everything about an invoice that depends only on the seller: paragraph
+    styles, the decoded logo, colours and footer/signatory text.
+    Built once and shared by every render for that seller.
+    """
+
+    def __init__(self, **config):
+        # ReportLab is only loaded once the first template is built, so the
+        # registry and tenant configs stay cheap for processes that never render
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet
+
+        self.config = {**DEFAULT_TEMPLATE_CONFIG, **config}
+
+        self.header_color = colors.HexColor(self.config['header_color'])
+        self.table_header_color = colors.HexColor(self.config['table_header_color'])
+        self.table_body_color = colors.HexColor(self.config['table_body_color'])
+        self.footer_color = colors.HexColor(self.config['footer_color'])
+        self.footer_text = self.config['footer_text']
+        self.signatory_text = self.config['signatory_text']
+
+        self.styles = getSampleStyleSheet()
+        self._setup_styles()
+        self.logo = self._load_logo(self.config['logo_path'])
+
+    def _setup_styles(self):
+        from reportlab.lib import colors
+        from reportlab.lib.styles import ParagraphStyle
+
+        heading_color = colors.HexColor(self.config['heading_color'])
+        label_color = colors.HexColor(self.config['label_color'])
+
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=self.styles['Heading2'],
+            fontSize=12,
+            textColor=heading_color,
+            spaceAfter=12,
+            fontName='Helvetica-Bold'
+        )
+
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=self.styles['Normal'],
+            fontSize=10,
+            spaceAfter=6
+        )
+
+        self.small_style = ParagraphStyle(
+            'SmallNormal',
+            parent=self.styles['Normal'],
+            fontSize=9,
+            spaceAfter=3
+        )
+
+        self.table_header_style = ParagraphStyle(
+            'TableHeader',
+            parent=self.styles['Normal'],
+            fontSize=10,
+            fontName='Helvetica-Bold',
+            textColor=colors.whitesmoke
+        )
+
+        self.invoice_label_style = ParagraphStyle(
+            'InvoiceLabel',
+            parent=self.styles['Normal'],
+            fontSize=9,
+            fontName='Helvetica-Bold',
+            textColor=label_color
+        )
+
+        self.invoice_value_style = ParagraphStyle(
+            'InvoiceValue',
+            parent=self.styles['Normal'],
+            fontSize=11,
+            fontName='Helvetica-Bold',
+            textColor=label_color
+        )
+
+        self.grand_total_style = ParagraphStyle(
+            'GrandTotal',
+            parent=self.styles['Normal'],
+            fontSize=12,
+            fontName='Helvetica-Bold'
+        )
+
+    @staticmethod
+    def _load_logo(logo_path):
+        if not logo_path or not os.path.exists(logo_path):
+            return None
+        try:
+            from reportlab.lib.utils import ImageReader
+            reader = ImageReader(logo_path)
+            # Decode now so renders only ever reuse the pixel data
+            reader.getRGBData()
+            return reader
+        except Exception as e:
+            print(f"Warning: Could not load logo - {e}")
+            return None
+
+
+class TemplateRegistry:
+    """
+    Seller/tenant keyed cache of InvoiceTemplates. Tenant configs are kept
+    for every registered seller, while built templates are held in an LRU
+    bounded by max_size.
+    """
+
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self._configs = {}
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, tenant_id, **config):
+        if tenant_id != DEFAULT_TENANT:
+            tenant_id = str(tenant_id).strip().upper()
+        with self._lock:
+            self._configs[tenant_id] = config
+            # Drop any template built from a previous config
+            for key in [key for key in self._templates if key[0] == tenant_id]:
+                del self._templates[key]
+
+    def load(self, tenants):
+        """Register tenants from a {tenant_id: config} mapping."""
+        for tenant_id, config in tenants.items():
+            self.register(tenant_id, **config)
+
+    def get(self, tenant_id=None, logo_path=None):
+        """
+        Return the template for tenant_id, building it on first use.
+        Unregistered tenants share the default template; logo_path is
+        used when the tenant config does not name its own logo.
+        """
+        with self._lock:
+            config = self._configs.get(tenant_id)
+            if config is None:
+                tenant_id, config = DEFAULT_TENANT, self._configs.get(DEFAULT_TENANT, {})
+            if config.get('logo_path'):
+                logo_path = config['logo_path']
+
+            key = (tenant_id, logo_path)
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+
+        # Build outside the lock; a concurrent duplicate build is harmless
+        template = InvoiceTemplate(**{**config, 'logo_path': logo_path})
+
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        return template
+
+    def logo_path(self, tenant_id=None, logo_path=None):
+        """Logo file get() would use for tenant_id, without building the template."""
+        with self._lock:
+            config = self._configs.get(tenant_id)
+            if config is None:
+                config = self._configs.get(DEFAULT_TENANT, {})
+        return config.get('logo_path') or logo_path
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def __len__(self):
+        return len(self._templates)
+
+
+registry = TemplateRegistry(max_size=int(os.environ.get('TEMPLATE_CACHE_SIZE', 32)))
+
+
+def tenant_key(company_info):
+    """Sellers are identified by GSTIN, falling back to their name."""
+    return (company_info.get('gstin') or company_info.get('name') or '').strip().upper() or None
@@ -0,0 +1,235 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+
+PAISE = Decimal('0.01')
+HUNDRED = Decimal('100')
+ZERO = Decimal('0.00')
+
+
+def to_decimal(value, default=0):
+    """Exact Decimal for a JSON number or numeric string."""
+    if value is None or value == '':
+        value = default
+    if isinstance(value, Decimal):
+        return value
+    # str() of a float is its shortest round-trip form, e.g. 0.1 -> '0.1'
+    return Decimal(str(value))
+
+
+def round_paise(value):
+    """GST amounts are rounded half-up to the nearest paisa."""
+    return value.quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def is_same_state(seller_state, buyer_state):
+    return seller_state.strip().lower() == buyer_state.strip().lower()
+
+
+def calculate_tax(taxable_amount, seller_state, buyer_state, cgst_rate=9, sgst_rate=9, igst_rate=18):
+    """
+    Intra-state supplies pay CGST + SGST, inter-state supplies pay IGST.
+    Returns (cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount).
+    """
+    taxable_amount = to_decimal(taxable_amount)
+    cgst_rate = to_decimal(cgst_rate)
+    sgst_rate = to_decimal(sgst_rate)
+    igst_rate = to_decimal(igst_rate)
+
+    if is_same_state(seller_state, buyer_state):
+        cgst_amount = round_paise(taxable_amount * cgst_rate / HUNDRED)
+        sgst_amount = round_paise(taxable_amount * sgst_rate / HUNDRED)
+        return cgst_rate, cgst_amount, sgst_rate, sgst_amount, ZERO, ZERO
+    else:
+        igst_amount = round_paise(taxable_amount * igst_rate / HUNDRED)
+        return ZERO, ZERO, ZERO, ZERO, igst_rate, igst_amount
+
+
+class InvoiceTotals:
+    """Every amount printed on an invoice, computed once with exact decimals."""
+
+    __slots__ = (
+        'line_amounts', 'subtotal', 'discount_type', 'discount_value', 'discount_amount',
+        'taxable_amount', 'cgst_rate', 'cgst_amount', 'sgst_rate', 'sgst_amount',
+        'igst_rate', 'igst_amount', 'shipping_amount', 'total_amount',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+    def add_totals_kwargs(self):
+        """Keyword arguments for InvoiceGenerator.add_totals."""
+        return {
+            'subtotal': self.subtotal,
+            'discount_type': self.discount_type,
+            'discount_value': self.discount_value,
+            'discount_amount': self.discount_amount,
+            'cgst_rate': self.cgst_rate,
+            'cgst_amount': self.cgst_amount,
+            'sgst_rate': self.sgst_rate,
+            'sgst_amount': self.sgst_amount,
+            'igst_rate': self.igst_rate,
+            'igst_amount': self.igst_amount,
+            'shipping_amount': self.shipping_amount,
+            'total_amount': self.total_amount,
+        }
+
+    def to_dict(self):
+        """JSON friendly view with amounts as 2dp strings."""
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if name == 'line_amounts':
+                value = [str(amount) for amount in value]
+            elif isinstance(value, Decimal):
+                value = str(value)
+            result[name] = value
+        return result
+
+
+def number_to_words(number):
+    """Amount in Indian-system words (crore, lakh), e.g. 1500 -> ONE THOUSAND FIVE HUNDRED RUPEES ONLY."""
+    ones = ["", "ONE", "TWO", "THREE", "FOUR", "FIVE", "SIX", "SEVEN", "EIGHT", "NINE"]
+    teens = ["TEN", "ELEVEN", "TWELVE", "THIRTEEN", "FOURTEEN", "FIFTEEN",
+            "SIXTEEN", "SEVENTEEN", "EIGHTEEN", "NINETEEN"]
+    tens = ["", "", "TWENTY", "THIRTY", "FORTY", "FIFTY", "SIXTY", "SEVENTY", "EIGHTY", "NINETY"]
+
+    def convert_below_thousand(num):
+        if num == 0:
+            return ""
+        elif num < 10:
+            return ones[num]
+        elif num < 20:
+            return teens[num - 10]
+        elif num < 100:
+            return tens[num // 10] + ("" if num % 10 == 0 else " " + ones[num % 10])
+        else:
+            return ones[num // 100] + " HUNDRED" + ("" if num % 100 == 0 else " " + convert_below_thousand(num % 100))
+
+    if number == 0:
+        return "ZERO"
+
+    num = int(number)
+    words = ""
+    if num >= 10000000:
+        words += convert_below_thousand(num // 10000000) + " CRORE "
+        num %= 10000000
+    if num >= 100000:
+        words += convert_below_thousand(num // 100000) + " LAKH "
+        num %= 100000
+    if num >= 1000:
+        words += convert_below_thousand(num // 1000) + " THOUSAND "
+        num %= 1000
+    if num > 0:
+        words += convert_below_thousand(num)
+    return words.strip() + " RUPEES ONLY"
+
+
+def line_amount(item):
+    return round_paise(to_decimal(item['quantity']) * to_decimal(item['rate']))
+
+
+def compute_totals(data):
+    """Compute line amounts, discount, GST split and grand total for a payload."""
+    line_amounts = [line_amount(item) for item in data['items']]
+    return _totals(data, line_amounts, sum(line_amounts, ZERO))
+
+
+def _totals(data, line_amounts, subtotal):
+    discount_type = data.get('discount_type', 'none')
+    discount_value = to_decimal(data.get('discount_value'))
+    discount_amount = ZERO
+
+    if discount_type == 'percentage':
+        discount_amount = round_paise(subtotal * discount_value / HUNDRED)
+    elif discount_type == 'amount':
+        discount_amount = round_paise(discount_value)
+
+    # Tax is charged on the discounted amount
+    taxable_amount = subtotal - discount_amount
+
+    cgst_rate, cgst_amount, sgst_rate, sgst_amount, igst_rate, igst_amount = calculate_tax(
+        taxable_amount,
+        seller_state=data['company_info']['state'],
+        buyer_state=data['buyer_info']['state'],
+        cgst_rate=to_decimal(data.get('cgst_rate'), 9),
+        sgst_rate=to_decimal(data.get('sgst_rate'), 9),
+        igst_rate=to_decimal(data.get('igst_rate'), 18)
+    )
+
+    shipping_amount = round_paise(to_decimal(data.get('shipping_charges')))
+    total_amount = taxable_amount + cgst_amount + sgst_amount + igst_amount + shipping_amount
+
+    return InvoiceTotals(
+        line_amounts=line_amounts,
+        subtotal=subtotal,
+        discount_type=discount_type,
+        discount_value=discount_value,
+        discount_amount=discount_amount,
+        taxable_amount=taxable_amount,
+        cgst_rate=cgst_rate,
+        cgst_amount=cgst_amount,
+        sgst_rate=sgst_rate,
+        sgst_amount=sgst_amount,
+        igst_rate=igst_rate,
+        igst_amount=igst_amount,
+        shipping_amount=shipping_amount,
+        total_amount=total_amount,
+    )
+
+
+class RunningTotals:
+    """
+    Totals accumulated one line item at a time, for invoices whose items
+    arrive as a stream. Only the running subtotal is kept; finish() gives
+    the same InvoiceTotals as compute_totals, minus the per-line amounts.
+    """
+
+    def __init__(self):
+        self.subtotal = ZERO
+        self.item_count = 0
+        self.totals = None
+
+    def add(self, item):
+        amount = line_amount(item)
+        self.subtotal += amount
+        self.item_count += 1
+        return amount
+
+    def finish(self, data):
+        self.totals = _totals(data, [], self.subtotal)
+        return self.totals
+
+
+BATCH_COLUMNS = (
+    'subtotal', 'discount_amount', 'taxable_amount', 'cgst_amount',
+    'sgst_amount', 'igst_amount', 'shipping_amount', 'total_amount',
+)
+
+
+def compute_totals_batch(payloads):
+    """
+    Totals for many invoices at once, for reconciliation runs that never
+    render a PDF. Results are returned column-wise, one list per amount plus
+    'invoice_number', aligned with the input order; invoices that cannot be
+    computed get None in every column and an entry in 'errors'.
+    """
+    columns = {name: [] for name in ('invoice_number',) + BATCH_COLUMNS}
+    errors = []
+
+    for index, data in enumerate(payloads):
+        try:
+            totals = compute_totals(data)
+        except (KeyError, TypeError, ValueError, ArithmeticError, AttributeError) as e:
+            errors.append({'index': index, 'error': f'{type(e).__name__}: {e}'})
+            columns['invoice_number'].append(data.get('invoice_number') if isinstance(data, dict) else None)
+            for name in BATCH_COLUMNS:
+                columns[name].append(None)
+            continue
+
+        columns['invoice_number'].append(data.get('invoice_number'))
+        for name in BATCH_COLUMNS:
+            columns[name].append(getattr(totals, name))
+
+    columns['errors'] = errors
+    return columns
@@ -0,0 +1,223 @@
+from contextlib import contextmanager, nullcontext
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name, help_text, buckets, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = sorted(buckets)
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self, snapshot=None):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        if snapshot is None:
+            snapshot = self.snapshot()
+
+        for label_value, series in sorted(snapshot.items(), key=lambda entry: str(entry[0])):
+            labels = f'{self.label}="{label_value}",' if self.label else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} {cumulative}')
+            suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{suffix} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    """
+    Histograms of this process. After share(directory), every process
+    writes its series to its own metrics-<pid>-<token>.json there, at most
+    once per dump_interval seconds while it serves requests and whenever
+    it answers /metrics (gunicorn.conf.py also dumps when a worker exits).
+    render() sums the files of all processes, including ones that have
+    exited since their counts are cumulative, so any gunicorn worker can
+    answer /metrics for the whole server. The token keeps a later process
+    that reuses a pid from overwriting the earlier one's counts.
+    """
+
+    def __init__(self, dump_interval=1.0):
+        self.histograms = []
+        self.directory = None
+        self.dump_interval = dump_interval
+        self._dump_lock = threading.Lock()
+        self._last_dump = 0.0
+        self._path_pid = None
+        self._path = None
+
+    def histogram(self, name, help_text, buckets, label=None):
+        histogram = Histogram(name, help_text, buckets, label)
+        self.histograms.append(histogram)
+        return histogram
+
+    def share(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def _state_path(self):
+        # Forked workers inherit the registry, so the name is fixed per process
+        if self._path_pid != os.getpid():
+            self._path_pid = os.getpid()
+            self._path = os.path.join(self.directory, f'metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        return self._path
+
+    def dump(self):
+        """Write this process's series to the shared directory, if any."""
+        if self.directory is None:
+            return
+        # One writer per process at a time, so threads neither share the
+        # temporary file nor replace a newer snapshot with an older one
+        with self._dump_lock:
+            self._write()
+
+    def dump_soon(self):
+        """dump(), unless this process dumped within dump_interval or is dumping now."""
+        if self.directory is None or time.monotonic() - self._last_dump < self.dump_interval:
+            return
+        if not self._dump_lock.acquire(blocking=False):
+            return
+        try:
+            self._write()
+        finally:
+            self._dump_lock.release()
+
+    def _write(self):
+        self._last_dump = time.monotonic()
+        state = {
+            histogram.name: [[label_value, series] for label_value, series in histogram.snapshot().items()]
+            for histogram in self.histograms
+        }
+        path = self._state_path()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, path)
+
+    def _merged(self):
+        merged = {histogram.name: {} for histogram in self.histograms}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as state_file:
+                    state = json.load(state_file)
+            except (OSError, ValueError):
+                continue
+            for name, entries in state.items():
+                totals = merged.get(name)
+                if totals is None:
+                    continue
+                for label_value, series in entries:
+                    current = totals.get(label_value)
+                    totals[label_value] = series if current is None else [
+                        a + b for a, b in zip(current, series)
+                    ]
+        return merged
+
+    def render(self):
+        if self.directory is None:
+            return '\n'.join(histogram.render() for histogram in self.histograms) + '\n'
+        self.dump()
+        merged = self._merged()
+        return '\n'.join(histogram.render(merged[histogram.name]) for histogram in self.histograms) + '\n'
+
+
+class StageTimer:
+    """Collects wall-clock durations of named request stages, in order."""
+
+    enabled = True
+
+    def __init__(self):
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def server_timing(self):
+        """Value for the Server-Timing response header (durations in ms)."""
+        return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.durations.items())
+
+
+class NullTimer:
+    """Stand-in used when metrics are disabled; every stage is a no-op."""
+
+    enabled = False
+    durations = {}
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def server_timing(self):
+        return ''
+
+
+NULL_TIMER = NullTimer()
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'invoice_stage_duration_seconds', 'Time spent in each invoice request stage',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30],
+    label='stage'
+)
+REQUEST_SECONDS = registry.histogram(
+    'invoice_request_duration_seconds', 'End-to-end invoice request time',
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+)
+ITEM_COUNT = registry.histogram(
+    'invoice_items', 'Line items per rendered invoice',
+    buckets=[1, 5, 10, 25, 50, 100, 250, 1000, 5000, 10000, 50000]
+)
+PDF_BYTES = registry.histogram(
+    'invoice_pdf_bytes', 'Size of rendered invoice PDFs',
+    buckets=[4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+)
+PAGE_COUNT = registry.histogram(
+    'invoice_pages', 'Pages per rendered invoice',
+    buckets=[1, 2, 3, 5, 10, 25, 100, 500]
+)
+
+
+def record_request(timer, total_seconds):
+    for name, seconds in timer.durations.items():
+        STAGE_SECONDS.observe(seconds, name)
+    REQUEST_SECONDS.observe(total_seconds)
+    registry.dump_soon()
+
+
+def record_invoice(item_count, pdf_size, page_count=None):
+    ITEM_COUNT.observe(item_count)
+    PDF_BYTES.observe(pdf_size)
+    if page_count is not None:
+        PAGE_COUNT.observe(page_count)
@@ -0,0 +1,216 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+# Bump whenever layout changes so stale PDFs are never served for a key
+RENDER_VERSION = 5
+
+# Only the fields render_invoice actually consumes take part in the hash
+INVOICE_FIELDS = (
+    'invoice_number', 'invoice_date', 'po_number', 'agreement',
+    'discount_type', 'discount_value', 'shipping_charges',
+    'cgst_rate', 'sgst_rate', 'igst_rate',
+)
+COMPANY_FIELDS = ('name', 'address', 'city', 'state', 'pincode', 'gstin', 'email')
+BUYER_FIELDS = ('name', 'address', 'city', 'state', 'pincode', 'gstin')
+ITEM_FIELDS = ('description', 'hsn_code', 'quantity', 'rate')
+
+
+def canonical_payload(data):
+    """Reduce an invoice payload to the fields that affect the PDF."""
+    company_info = data.get('company_info') or {}
+    buyer_info = data.get('buyer_info') or {}
+    return {
+        **{field: data.get(field) for field in INVOICE_FIELDS},
+        'company_info': {field: company_info.get(field) for field in COMPANY_FIELDS},
+        'buyer_info': {field: buyer_info.get(field) for field in BUYER_FIELDS},
+        'items': [{field: item.get(field) for field in ITEM_FIELDS} for item in data.get('items') or []],
+    }
+
+
+def cache_key(data, **context):
+    """
+    Content address for an invoice: a SHA-256 of the canonical payload plus
+    anything else that changes the output (template config, footer date).
+    """
+    document = {
+        'version': RENDER_VERSION,
+        'invoice': canonical_payload(data),
+        'context': context,
+    }
+    encoded = json.dumps(document, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PDFCache:
+    """
+    Two-tier cache of rendered PDFs keyed by cache_key(). Recently used PDFs
+    live in an in-memory LRU bounded by max_memory_bytes; everything stored
+    is also written to disk_dir, which is trimmed oldest-first once it grows
+    past max_disk_bytes. Set disk_dir to None for a memory-only cache.
+
+    Several processes may share disk_dir. Lookups go to the files
+    themselves, and a file's mtime records its last use. Each process
+    rebuilds its index of the directory from those files whenever its
+    own writes add up to a sixteenth of max_disk_bytes, and before it
+    trims, so entries written or removed by other processes are counted.
+    """
+
+    def __init__(self, max_memory_bytes=64 * 1024 * 1024, disk_dir=None,
+                 max_disk_bytes=1024 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._written_since_scan = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """Rebuild the disk index from the directory, least recently used first."""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.pdf'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue  # removed by another process meanwhile
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+
+        with self._lock:
+            self._disk = disk
+            self._disk_bytes = sum(disk.values())
+            self._written_since_scan = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.pdf')
+
+    def _forget_disk(self, key):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _index_disk(self, key, size):
+        if key in self._disk:
+            self._disk.move_to_end(key)
+        else:
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def get(self, key):
+        with self._lock:
+            pdf_bytes = self._memory.get(key)
+            if pdf_bytes is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+
+        # Another process may have written the file, so look for it even
+        # when this process's index does not list it
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as pdf_file:
+                    pdf_bytes = pdf_file.read()
+                os.utime(path)
+            except OSError:
+                pdf_bytes = None
+
+        with self._lock:
+            if pdf_bytes is None:
+                if self.disk_dir:
+                    self._forget_disk(key)
+                self.misses += 1
+                return None
+            self._index_disk(key, len(pdf_bytes))
+            self._remember(key, pdf_bytes)
+            self.hits += 1
+            return pdf_bytes
+
+    def put(self, key, pdf_bytes):
+        with self._lock:
+            self._remember(key, pdf_bytes)
+            write_to_disk = self.disk_dir and key not in self._disk
+
+        if write_to_disk:
+            if os.path.exists(self._disk_path(key)):
+                # Already stored by another process; same key, same bytes
+                with self._lock:
+                    self._index_disk(key, len(pdf_bytes))
+                return
+
+            # Write to a temp file and rename so readers never see partial PDFs
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as tmp_file:
+                    tmp_file.write(pdf_bytes)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                print(f"Warning: Could not write PDF cache entry - {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+
+            with self._lock:
+                self._index_disk(key, len(pdf_bytes))
+                self._written_since_scan += len(pdf_bytes)
+                rescan = (self._disk_bytes > self.max_disk_bytes
+                          or self._written_since_scan > self.max_disk_bytes // 16)
+            if rescan:
+                self._scan_disk()
+            with self._lock:
+                evicted = self._trim_disk()
+            for old_key in evicted:
+                try:
+                    os.remove(self._disk_path(old_key))
+                except OSError:
+                    pass
+
+    def _remember(self, key, pdf_bytes):
+        if len(pdf_bytes) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = pdf_bytes
+        self._memory_bytes += len(pdf_bytes)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _trim_disk(self):
+        evicted = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(old_key)
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+            }
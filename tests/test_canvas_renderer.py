@@ -0,0 +1,79 @@
+"""
+The direct-canvas engine has to draw the same text, broken into the same
+lines, as the platypus InvoiceGenerator it stands in for.
+"""
+import random
+import re
+import unittest
+import zlib
+
+from reportlab.pdfbase.pdfutils import asciiBase85Decode
+
+from benchmarks.synthetic import invoice_payload
+from canvas_renderer import CanvasInvoiceRenderer
+from invoice_generator import render_invoice
+
+
+# Content streams and form XObjects, as ReportLab writes them by default
+STREAM = re.compile(rb'/Filter \[ /ASCII85Decode /FlateDecode \].*?\bstream\r?\n(.*?)endstream', re.S)
+SHOWN_TEXT = re.compile(rb'\(((?:\\.|[^\\)])*)\) Tj')
+ESCAPE = re.compile(rb'\\([0-7]{1,3}|.)')
+
+WORDS = ['Plot', 'No', '14', 'Sector', 'Near', 'Old', 'Bus', 'Stand', 'Main', 'Road', 'Opposite',
+         'Government', 'Hospital', 'Industrial', 'Area', 'Phase', 'III', 'Behind', 'Railway', 'Colony']
+
+
+def _unescape(match):
+    escaped = match.group(1)
+    return bytes([int(escaped, 8)]) if escaped.isdigit() else escaped
+
+
+def text_lines(pdf):
+    """Every string shown on the pages (including page furniture forms), sorted."""
+    lines = []
+    for encoded in STREAM.findall(pdf):
+        content = zlib.decompress(asciiBase85Decode(encoded.strip().decode('latin-1')))
+        lines += [ESCAPE.sub(_unescape, text).decode('cp1252') for text in SHOWN_TEXT.findall(content)]
+    return sorted(lines)
+
+
+def wrapping_payload(seed):
+    """A standard invoice whose addresses, names and descriptions wrap by varying amounts."""
+    rng = random.Random(seed)
+    data = invoice_payload(rng.randint(1, 6), seed=seed)
+    data['company_info']['address'] = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 16)))
+    data['buyer_info']['name'] = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))) + ' Pharmacy'
+    data['buyer_info']['address'] = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 16)))
+    for item in data['items']:
+        item['description'] = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+    return data
+
+
+class CanvasMatchesPlatypusTest(unittest.TestCase):
+
+    def render(self, data, engine):
+        return render_invoice(data, generated_on='31/03/2025', reproducible=True, engine=engine)
+
+    def test_wrapped_text_breaks_like_platypus(self):
+        drawn_on_canvas = 0
+        for seed in range(120):
+            data = wrapping_payload(seed)
+            fast = self.render(data, 'auto')
+            if not isinstance(fast, CanvasInvoiceRenderer):
+                continue
+            drawn_on_canvas += 1
+            with self.subTest(seed=seed):
+                self.assertEqual(text_lines(fast.get_pdf_bytes()),
+                                 text_lines(self.render(data, 'platypus').get_pdf_bytes()))
+        # Most of these fit on one page, so the comparison must not be vacuous
+        self.assertGreater(drawn_on_canvas, 60)
+
+    def test_missing_email_leaves_no_blank_line(self):
+        data = invoice_payload(3)
+        data['company_info']['email'] = ''
+        self.assertEqual(text_lines(self.render(data, 'auto').get_pdf_bytes()),
+                         text_lines(self.render(data, 'platypus').get_pdf_bytes()))
+
+
+if __name__ == '__main__':
+    unittest.main()
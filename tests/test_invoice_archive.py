@@ -0,0 +1,109 @@
+"""
+The archive finds invoices through its index and serves the stored bytes
+back whole or by HTTP range, with the PDF's SHA-256 as its ETag.
+"""
+from decimal import Decimal
+import tempfile
+import unittest
+from unittest import mock
+
+import app as app_module
+from benchmarks.synthetic import invoice_payload
+from invoice_archive import InvoiceArchive
+from invoice_totals import compute_totals
+
+
+def fake_pdf(seed):
+    return b'%PDF-1.4\n' + bytes((seed + index) % 256 for index in range(1000))
+
+
+def fill_archive(test):
+    """Four invoices in a fresh archive in a temporary directory."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    test.archive = InvoiceArchive(directory.name, max_segment_bytes=2500)
+    test.payloads = [invoice_payload(2, seed=seed) for seed in range(4)]
+    test.ids = [test.archive.store(fake_pdf(seed), data, compute_totals(data))
+                for seed, data in enumerate(test.payloads)]
+
+
+class InvoiceArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        fill_archive(self)
+
+    def test_store_is_idempotent_and_rolls_segments(self):
+        self.assertEqual(self.archive.store(fake_pdf(2), self.payloads[2]), self.ids[2])
+        self.assertEqual(self.archive.stats(), {'invoices': 4, 'bytes': 4 * len(fake_pdf(0))})
+        # Two 1009 byte PDFs fit in a 2500 byte segment, a third does not
+        self.assertEqual([self.archive.get(archive_id)['segment'] for archive_id in self.ids], [1, 1, 2, 2])
+        for seed, archive_id in enumerate(self.ids):
+            self.assertEqual(self.archive.read(self.archive.get(archive_id)), fake_pdf(seed))
+
+    def test_find(self):
+        self.assertEqual([record['id'] for record in self.archive.find()], self.ids[::-1])
+        self.assertEqual([record['id'] for record in self.archive.find(limit=2, offset=1)], self.ids[2:0:-1])
+
+        data = self.payloads[1]
+        found = self.archive.find(invoice_number=data['invoice_number'])
+        self.assertEqual([record['id'] for record in found], [self.ids[1]])
+        found = self.archive.find(buyer_gstin=' ' + data['buyer_info']['gstin'].lower())
+        self.assertEqual([record['id'] for record in found], [self.ids[1]])
+
+        total = compute_totals(data).total_amount
+        self.assertEqual(found[0]['total'], str(total))
+        for min_total, max_total, expected in ((total, total, True), (total + Decimal('0.01'), None, False),
+                                               (None, total - Decimal('0.01'), False)):
+            ids = [record['id'] for record in self.archive.find(min_total=min_total, max_total=max_total)]
+            with self.subTest(min_total=min_total, max_total=max_total):
+                self.assertEqual(self.ids[1] in ids, expected)
+
+
+class ArchivedPdfRangeTest(unittest.TestCase):
+
+    def setUp(self):
+        fill_archive(self)
+        patcher = mock.patch.object(app_module, 'archive', self.archive)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app_module.app.test_client()
+        self.url = f'/api/archive/invoices/{self.ids[3]}/pdf'
+        self.pdf = fake_pdf(3)
+
+    def test_whole_pdf(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.pdf)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.client.get('/api/archive/invoices/999/pdf').status_code, 404)
+
+    def test_ranges(self):
+        length = len(self.pdf)
+        cases = [
+            ('bytes=0-99', 0, 100),
+            ('bytes=100-', 100, length),
+            ('bytes=-10', length - 10, length),
+            ('bytes=1000-5000', 1000, length),
+        ]
+        for header, start, stop in cases:
+            response = self.client.get(self.url, headers={'Range': header})
+            with self.subTest(range=header):
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.data, self.pdf[start:stop])
+                self.assertEqual(response.headers['Content-Range'], f'bytes {start}-{stop - 1}/{length}')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, headers={'Range': f'bytes={len(self.pdf)}-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], f'bytes */{len(self.pdf)}')
+
+    def test_etag(self):
+        etag = self.client.get(self.url).headers['ETag']
+        response = self.client.get(self.url, headers={'If-None-Match': etag, 'Range': 'bytes=0-9'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': '"other"'}).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+InvoiceSchema rejects malformed payloads with one error per field, named
+by its path, and hands back valid ones normalised for the renderer.
+"""
+import copy
+import unittest
+
+from benchmarks.synthetic import invoice_payload
+from invoice_schema import InvoiceSchema, ValidationError
+
+
+class InvoiceSchemaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = InvoiceSchema(max_items=5)
+        self.data = invoice_payload(3)
+
+    def errors(self, data):
+        """{field: message} for a payload that must fail validation."""
+        with self.assertRaises(ValidationError) as raised:
+            self.schema.validate(data)
+        return {error['field']: error['message'] for error in raised.exception.errors}
+
+    def test_valid_payload_is_normalised(self):
+        self.data['invoice_date'] = '31/03/2025'
+        self.data['company_info']['gstin'] = ' 27aafcf1234k1z5 '
+        self.data['items'][0]['quantity'] = '2'
+        self.data['items'][1]['rate'] = '12.5'
+        self.data['unused'] = 'dropped'
+        for name in ('discount_type', 'discount_value', 'cgst_rate', 'sgst_rate', 'igst_rate'):
+            del self.data[name]
+        valid = self.schema.validate(self.data)
+        self.assertEqual(valid['invoice_date'], '2025-03-31')
+        self.assertEqual(valid['company_info']['gstin'], '27AAFCF1234K1Z5')
+        self.assertEqual(valid['items'][0]['quantity'], 2)
+        self.assertEqual(valid['items'][1]['rate'], 12.5)
+        self.assertNotIn('unused', valid)
+        self.assertEqual((valid['discount_type'], valid['discount_value']), ('none', 0))
+        self.assertEqual((valid['cgst_rate'], valid['sgst_rate'], valid['igst_rate']), (9, 9, 18))
+
+    def test_missing_buyer_gstin_is_left_out(self):
+        del self.data['buyer_info']['gstin']
+        self.data['company_info']['gstin'] = ''
+        valid = self.schema.validate(self.data)
+        self.assertNotIn('gstin', valid['buyer_info'])
+        self.assertEqual(valid['company_info']['gstin'], '')
+
+    def test_gstin(self):
+        for gstin in ('27AAFCF1234K1Z', '27AAFCF1234K1X5', 'AAAFCF1234K1Z5', '27AAFCF1234K0Z5'):
+            data = copy.deepcopy(self.data)
+            data['buyer_info']['gstin'] = gstin
+            with self.subTest(gstin=gstin):
+                self.assertEqual(self.errors(data),
+                                 {'buyer_info.gstin': 'must be a valid 15 character GSTIN'})
+
+    def test_pincode(self):
+        for pincode in ('41102', '4110266', '41102A'):
+            data = copy.deepcopy(self.data)
+            data['company_info']['pincode'] = pincode
+            with self.subTest(pincode=pincode):
+                self.assertEqual(self.errors(data),
+                                 {'company_info.pincode': 'must be a 6 digit PIN code'})
+        self.data['company_info']['pincode'] = 411026
+        self.assertEqual(self.schema.validate(self.data)['company_info']['pincode'], '411026')
+
+    def test_hsn_code(self):
+        for hsn_code in ('300', '300490121', '3004A'):
+            data = copy.deepcopy(self.data)
+            data['items'][2]['hsn_code'] = hsn_code
+            with self.subTest(hsn_code=hsn_code):
+                self.assertEqual(self.errors(data),
+                                 {'items[2].hsn_code': 'must be a 4 to 8 digit HSN/SAC code'})
+        for hsn_code in ('3004', '30049012', ''):
+            self.data['items'][2]['hsn_code'] = hsn_code
+            self.schema.validate(self.data)
+
+    def test_invoice_date(self):
+        for invoice_date in ('2025-02-30', '31-03-2025', 20250331, None):
+            data = copy.deepcopy(self.data)
+            data['invoice_date'] = invoice_date
+            expected = 'is required' if invoice_date is None else 'must be a date as YYYY-MM-DD'
+            with self.subTest(invoice_date=invoice_date):
+                self.assertEqual(self.errors(data), {'invoice_date': expected})
+
+    def test_numbers(self):
+        cases = [
+            ('quantity', 0, 'must be greater than 0'),
+            ('quantity', 'two', 'must be a number'),
+            ('quantity', True, 'must be a number'),
+            ('quantity', 'nan', 'must be a number'),
+            ('rate', -1, 'must be at least 0'),
+            ('rate', 10 ** 13, 'must be at most 1000000000000'),
+        ]
+        for name, value, message in cases:
+            data = copy.deepcopy(self.data)
+            data['items'][1][name] = value
+            with self.subTest(name=name, value=value):
+                self.assertEqual(self.errors(data), {f'items[1].{name}': message})
+
+    def test_percentage_discount_over_100(self):
+        self.data['discount_type'] = 'percentage'
+        self.data['discount_value'] = 101
+        self.assertEqual(self.errors(self.data),
+                         {'discount_value': 'must be at most 100 for a percentage discount'})
+        self.data['discount_type'] = 'amount'
+        self.schema.validate(self.data)
+
+    def test_every_error_is_reported_with_its_item_path(self):
+        self.data['items'][0]['description'] = '   '
+        self.data['items'][2]['rate'] = 'free'
+        del self.data['items'][1]['quantity']
+        self.data['buyer_info'] = 'Apollo'
+        self.assertEqual(self.errors(self.data), {
+            'buyer_info': 'must be an object',
+            'items[0].description': 'is required',
+            'items[1].quantity': 'is required',
+            'items[2].rate': 'must be a number',
+        })
+
+    def test_items_count(self):
+        self.data['items'] = []
+        self.assertEqual(self.errors(self.data), {'items': 'must have at least 1 item(s)'})
+        self.data['items'] = invoice_payload(6)['items']
+        self.assertEqual(self.errors(self.data), {'items': 'must have at most 5 items'})
+        self.data['items'] = {'description': 'Gloves'}
+        self.assertEqual(self.errors(self.data), {'items': 'must be a list'})
+
+    def test_payload_must_be_an_object(self):
+        for payload in (None, [], 'invoice'):
+            with self.subTest(payload=payload):
+                self.assertEqual(set(self.errors(payload)), {'payload'})
+
+    def test_streamed_item_paths(self):
+        with self.assertRaises(ValidationError) as raised:
+            self.schema.validate_item({'description': 'Gloves', 'quantity': -2, 'rate': 1}, 41)
+        self.assertEqual(raised.exception.errors,
+                         [{'field': 'items[41].quantity', 'message': 'must be greater than 0'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+InvoiceStream has to read the same header and items however the body is
+split into chunks, whether the items come as NDJSON or as a JSON array.
+"""
+import io
+import json
+import random
+import unittest
+
+from invoice_stream import InvoiceStream, StreamFormatError
+
+
+HEADER = {'invoice_number': 'INV/1', 'buyer_info': {'name': 'Café Pharmacy', 'state': 'Goa'}}
+
+ITEMS = [
+    {'description': 'Gloves, "nitrile"', 'quantity': 2, 'rate': 150},
+    {'description': 'Syringe ₹5 [pack]\nof 100', 'quantity': 10, 'rate': 12.5},
+    {'description': 'Masks {N95}', 'quantity': 1, 'rate': '99.99', 'hsn_code': '6307'},
+]
+
+
+class RandomChunks:
+    """A body whose reads return between 1 and size bytes, cutting UTF-8 sequences anywhere."""
+
+    def __init__(self, body, seed):
+        self.body = io.BytesIO(body)
+        self.rng = random.Random(seed)
+
+    def read(self, size=-1):
+        return self.body.read(self.rng.randint(1, size))
+
+
+def ndjson_body(items=ITEMS):
+    return '\n'.join(json.dumps(record, ensure_ascii=False) for record in [HEADER] + items).encode()
+
+
+def array_body(items=ITEMS):
+    lines = [json.dumps(HEADER, ensure_ascii=False), json.dumps(items, ensure_ascii=False, indent=2)]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def parse(stream, chunk_size=64):
+    invoice_stream = InvoiceStream(stream, chunk_size=chunk_size)
+    return invoice_stream.read_header(), list(invoice_stream.items())
+
+
+class InvoiceStreamTest(unittest.TestCase):
+
+    def test_every_chunk_size(self):
+        for name, body in (('ndjson', ndjson_body()), ('array', array_body())):
+            for chunk_size in range(1, len(body) + 1):
+                with self.subTest(framing=name, chunk_size=chunk_size):
+                    self.assertEqual(parse(io.BytesIO(body), chunk_size), (HEADER, ITEMS))
+
+    def test_short_reads(self):
+        for name, body in (('ndjson', ndjson_body()), ('array', array_body())):
+            for seed in range(50):
+                with self.subTest(framing=name, seed=seed):
+                    self.assertEqual(parse(RandomChunks(body, seed), 16), (HEADER, ITEMS))
+
+    def test_blank_lines_and_compact_array(self):
+        header = json.dumps(HEADER).encode()
+        self.assertEqual(parse(io.BytesIO(header + b'\n\n' + ndjson_body().split(b'\n', 1)[1] + b'\n\n')),
+                         (HEADER, ITEMS))
+        self.assertEqual(parse(io.BytesIO(header + b'\n' + json.dumps(ITEMS).encode()), 7), (HEADER, ITEMS))
+
+    def test_header_only(self):
+        for body in (json.dumps(HEADER).encode(), json.dumps(HEADER).encode() + b'\n[]'):
+            with self.subTest(body=body[-4:]):
+                self.assertEqual(parse(io.BytesIO(body)), (HEADER, []))
+
+    def test_items_are_read_lazily(self):
+        body = io.BytesIO(ndjson_body(ITEMS * 200))
+        invoice_stream = InvoiceStream(body, chunk_size=256)
+        invoice_stream.read_header()
+        self.assertEqual(next(invoice_stream.items()), ITEMS[0])
+        self.assertLess(body.tell(), 1024)
+
+    def test_format_errors(self):
+        header = json.dumps(HEADER)
+        cases = {
+            '': 'Empty request body',
+            '  \n': 'Empty request body',
+            '{"invoice_number": ': 'Invalid header line',
+            '[1, 2]': 'Header line must be an object',
+            json.dumps({**HEADER, 'items': ITEMS}): 'Send items after the header line',
+            header + '\n{"quantity": 1}\n{"quantity": }': 'Invalid item line',
+            header + '\n[{"quantity": 1} {"quantity": 2}]': 'Expected , between items',
+            header + '\n[{"quantity": 1},': 'Unterminated items array',
+            header + '\n[{"quantity": 1}, {"quantity"': 'Invalid JSON',
+            header + '\n[{"quantity": 1}]\n{"quantity": 2}': 'Unexpected data after items array',
+        }
+        for body, message in cases.items():
+            with self.subTest(body=body[-20:]):
+                with self.assertRaisesRegex(StreamFormatError, message):
+                    parse(io.BytesIO(body.encode()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Invoice amounts are exact decimals rounded half-up to the paisa, with
+CGST + SGST inside a state and IGST across states.
+"""
+from decimal import Decimal
+import unittest
+
+from benchmarks.synthetic import invoice_payload
+from invoice_totals import (
+    RunningTotals, ZERO, calculate_tax, compute_totals, compute_totals_batch, round_paise, to_decimal,
+)
+
+
+def payload(items, seller_state='Maharashtra', buyer_state='Maharashtra', **charges):
+    return {
+        'company_info': {'state': seller_state},
+        'buyer_info': {'state': buyer_state},
+        'items': [{'quantity': quantity, 'rate': rate} for quantity, rate in items],
+        **charges,
+    }
+
+
+class InvoiceTotalsTest(unittest.TestCase):
+
+    def test_to_decimal(self):
+        self.assertEqual(to_decimal(0.1), Decimal('0.1'))
+        self.assertEqual(to_decimal('12.50'), Decimal('12.50'))
+        self.assertEqual(to_decimal(None), Decimal(0))
+        self.assertEqual(to_decimal('', 9), Decimal(9))
+
+    def test_round_paise_rounds_half_up(self):
+        self.assertEqual(round_paise(Decimal('9.045')), Decimal('9.05'))
+        self.assertEqual(round_paise(Decimal('9.055')), Decimal('9.06'))
+        self.assertEqual(round_paise(Decimal('9.0449')), Decimal('9.04'))
+
+    def test_line_amounts_round_to_the_paisa(self):
+        # 3 x 0.335 is 1.005 exactly, which binary floats would make 1.00
+        totals = compute_totals(payload([(3, 0.335), (7, '1.115')]))
+        self.assertEqual(totals.line_amounts, [Decimal('1.01'), Decimal('7.81')])
+        self.assertEqual(totals.subtotal, Decimal('8.82'))
+
+    def test_same_state_pays_cgst_and_sgst(self):
+        totals = compute_totals(payload([(1, '100.50')], 'Maharashtra', ' maharashtra '))
+        self.assertEqual((totals.cgst_amount, totals.sgst_amount), (Decimal('9.05'), Decimal('9.05')))
+        self.assertEqual((totals.igst_rate, totals.igst_amount), (ZERO, ZERO))
+        self.assertEqual(totals.total_amount, Decimal('118.60'))
+
+    def test_other_state_pays_igst(self):
+        totals = compute_totals(payload([(1, '100.50')], 'Maharashtra', 'Karnataka'))
+        self.assertEqual((totals.igst_rate, totals.igst_amount), (Decimal(18), Decimal('18.09')))
+        self.assertEqual((totals.cgst_amount, totals.sgst_amount), (ZERO, ZERO))
+        self.assertEqual(totals.total_amount, Decimal('118.59'))
+
+    def test_custom_rates(self):
+        self.assertEqual(calculate_tax('1000', 'Delhi', 'Delhi', cgst_rate=2.5, sgst_rate=2.5),
+                         (Decimal('2.5'), Decimal('25.00'), Decimal('2.5'), Decimal('25.00'), ZERO, ZERO))
+        self.assertEqual(calculate_tax('1000', 'Delhi', 'Goa', igst_rate=0),
+                         (ZERO, ZERO, ZERO, ZERO, Decimal(0), Decimal('0.00')))
+
+    def test_tax_is_charged_after_discount_plus_shipping(self):
+        totals = compute_totals(payload([(1, '100.05')], discount_type='percentage', discount_value=10,
+                                        shipping_charges='49.995'))
+        self.assertEqual(totals.discount_amount, Decimal('10.01'))
+        self.assertEqual(totals.taxable_amount, Decimal('90.04'))
+        self.assertEqual(totals.cgst_amount, Decimal('8.10'))
+        self.assertEqual(totals.shipping_amount, Decimal('50.00'))
+        self.assertEqual(totals.total_amount, Decimal('156.24'))
+
+        totals = compute_totals(payload([(2, 50)], discount_type='amount', discount_value='12.345'))
+        self.assertEqual(totals.discount_amount, Decimal('12.35'))
+        self.assertEqual(totals.taxable_amount, Decimal('87.65'))
+
+    def test_running_totals_match(self):
+        for seed in range(20):
+            data = invoice_payload(7, seed=seed)
+            running = RunningTotals()
+            amounts = [running.add(item) for item in data['items']]
+            expected = compute_totals(data)
+            with self.subTest(seed=seed):
+                self.assertEqual(amounts, expected.line_amounts)
+                self.assertEqual(running.finish(data).to_dict(), {**expected.to_dict(), 'line_amounts': []})
+
+    def test_batch_is_column_wise_and_reports_bad_invoices(self):
+        good = invoice_payload(2)
+        columns = compute_totals_batch([good, {'invoice_number': 'BAD/1', 'items': []}, 'junk'])
+        self.assertEqual(columns['invoice_number'], [good['invoice_number'], 'BAD/1', None])
+        self.assertEqual(columns['total_amount'], [compute_totals(good).total_amount, None, None])
+        self.assertEqual([error['index'] for error in columns['errors']], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()